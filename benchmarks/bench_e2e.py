@@ -0,0 +1,205 @@
+"""
+Offline end-to-end benchmark of a grading run. Generates N local bare
+repositories, serves them through the stand-in Classroom API and drives
+Grader.grade() with the local runner and a synthetic test script.
+
+    python -m benchmarks.bench_e2e --submissions 200 --script-ms 50 --runs 2
+
+The first run clones every repository; later runs push a new commit to
+`--update-fraction` of the repositories, so they measure the incremental
+path (probing, fetching and merging results) like a cron run does.
+"""
+from collections import defaultdict
+from config.configs import ProgramConfig
+from gh.fake_server import FakeClassroomServer
+from grader.grader import Grader
+from logger import build_logger
+from pathlib import Path
+from telemetry.telemetry import TRACE_FILE
+import argparse
+import json
+import logging
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+CLASSROOM_ID = 1
+ASSIGNMENT_ID = 1
+
+TEST_SCRIPT = """#!/usr/bin/env python3
+import json, sys, time
+time.sleep({script_s})
+line = "x" * 99 + "\\n"
+sys.stdout.write(line * {output_lines})
+print(json.dumps({{"passed": 1, "total": 1, "times": [{script_ms}] * 5}}))
+"""
+
+
+def git(*args: str, cwd: Path = None) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+class RemoteRepos:
+    """Bare repositories standing in for the students' GitHub repositories."""
+    def __init__(self, root: Path, n_repos: int, repo_kb: int) -> None:
+        self.root = root
+        self.n_repos = n_repos
+        self.template = root / "template"
+        self.template.mkdir(parents=True)
+
+        git("init", "-q", "-b", "main", cwd=self.template)
+        (self.template / "main.c").write_text("int main(void) { return 0; }\n")
+        (self.template / "data.bin").write_bytes(b"\0" * (repo_kb * 1024))
+        git("add", ".", cwd=self.template)
+        git("-c", "user.name=bench", "-c", "user.email=bench@localhost", "commit", "-q", "-m", "template", cwd=self.template)
+        self.tree = git("rev-parse", "HEAD^{tree}", cwd=self.template)
+        self.heads: dict[int, str] = {}
+
+    def full_name(self, idx: int) -> str:
+        return f"org/submission{idx}"
+
+    def path(self, idx: int) -> Path:
+        return self.root / "org" / f"submission{idx}.git"
+
+    def commit(self, idx: int) -> str:
+        # Every repository gets its own HEAD, built with plumbing to keep generation cheap
+        parent = ["-p", self.heads[idx]] if idx in self.heads else []
+        sha = git("-c", "user.name=bench", "-c", "user.email=bench@localhost", "commit-tree", self.tree, *parent, "-m", f"submission {idx} at {time.time()}", cwd=self.template)
+        if idx not in self.heads:
+            git("init", "-q", "--bare", "-b", "main", str(self.path(idx)))
+        git("push", "-q", "--force", str(self.path(idx)), f"{sha}:refs/heads/main", cwd=self.template)
+        self.heads[idx] = sha
+        return sha
+
+    def create(self) -> None:
+        for idx in range(self.n_repos):
+            self.commit(idx)
+
+    def commits(self) -> dict[str, str]:
+        return {self.full_name(idx): sha for idx, sha in self.heads.items()}
+
+
+def build_api_data(repos: RemoteRepos) -> tuple[list[dict], dict[int, list[dict]], dict[int, list[dict]]]:
+    classrooms = [{"id": CLASSROOM_ID, "name": "benchmark", "archived": False, "url": "https://classroom.github.com/classrooms/1"}]
+    assignment = {
+        "id": ASSIGNMENT_ID, "public_repo": False, "title": "benchmark", "type": "individual",
+        "invite_link": "https://classroom.github.com/a/benchmark", "invitations_enabled": True,
+        "slug": "benchmark", "students_are_repo_admins": False, "feedback_pull_requests_enabled": False,
+        "max_teams": None, "max_members": None, "editor": None, "accepted": repos.n_repos,
+        "submissions": repos.n_repos, "passing": 0, "language": None, "deadline": None,
+    }
+    submissions = [{
+        "id": idx, "submitted": True, "passing": False, "commit_count": 1, "grade": None,
+        "students": [{"id": idx, "login": f"student{idx}", "name": None,
+                      "avatar_url": f"https://avatars.githubusercontent.com/u/{idx}",
+                      "html_url": f"https://github.com/student{idx}"}],
+        "assignment": assignment,
+        "repository": {"id": idx, "name": f"submission{idx}", "full_name": repos.full_name(idx),
+                       "html_url": repos.path(idx).as_uri(), "node_id": f"R_{idx}",
+                       "private": True, "default_branch": "main"},
+    } for idx in range(repos.n_repos)]
+
+    return classrooms, {CLASSROOM_ID: [assignment]}, {ASSIGNMENT_ID: submissions}
+
+
+def build_config(working_dir: Path, test_script: Path, api_url: str, args: argparse.Namespace) -> ProgramConfig:
+    config = ProgramConfig.from_dict({
+        "grader": {
+            "working_dir": str(working_dir),
+            "grades_file": str(working_dir / "leaderboard.json"),
+            "runner": "local",
+            "local_workers": args.workers,
+            "github_api_url": api_url,
+            "prefetch_depth": args.prefetch_depth,
+        },
+        "assignments": [{
+            "name": "benchmark",
+            "id": ASSIGNMENT_ID,
+            "tasks": [{"name": f"task{idx}", "test_script_path": str(test_script)} for idx in range(args.tasks)],
+        }],
+    })
+    config.assert_valid()
+    return config
+
+
+def stage_times(trace_path: Path) -> dict[str, tuple[int, float]]:
+    stages: dict[str, list[float]] = defaultdict(lambda: [0, 0.0])
+    with open(trace_path, "r") as f:
+        for event in json.load(f)["traceEvents"]:
+            if event["ph"] == "X":
+                stages[event["name"]][0] += 1
+                stages[event["name"]][1] += event["dur"] / 1e6
+    return {name: (int(count), total) for name, (count, total) in stages.items()}
+
+
+def graded_count(results_log: Path, since: float) -> int:
+    with open(results_log, "r") as f:
+        return sum(1 for line in f if line.strip() and json.loads(line)["ts"] >= since)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None, help="local runner workers (default: number of CPUs)")
+    parser.add_argument("--prefetch-depth", type=int, default=1)
+    parser.add_argument("--script-ms", type=float, default=50.0, help="runtime of the synthetic test script")
+    parser.add_argument("--output-kb", type=int, default=4, help="stdout size of the synthetic test script")
+    parser.add_argument("--repo-kb", type=int, default=64, help="size of the file committed to every repository")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latency added to every API request")
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--update-fraction", type=float, default=0.1, help="share of repositories updated between runs")
+    parser.add_argument("--keep", action="store_true", help="keep the generated directory")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="grader-bench-"))
+    log = build_logger("bench", level=logging.WARNING)
+
+    try:
+        started = time.perf_counter()
+        repos = RemoteRepos(root / "remotes", args.submissions, args.repo_kb)
+        repos.create()
+        print(f"Generated {args.submissions} repositories in {time.perf_counter() - started:.1f}s under {root}")
+
+        test_script = root / "test.py"
+        test_script.write_text(TEST_SCRIPT.format(script_s=args.script_ms / 1000, script_ms=args.script_ms, output_lines=args.output_kb * 1024 // 100))
+        test_script.chmod(0o755)
+
+        working_dir = root / "work"
+        working_dir.mkdir()
+
+        classrooms, assignments, submissions = build_api_data(repos)
+        with FakeClassroomServer(classrooms, assignments, submissions, repos.commits(), latency_s=args.latency_ms / 1000) as server:
+            config = build_config(working_dir, test_script, server.url, args)
+
+            for run in range(args.runs):
+                if run > 0:
+                    updated = range(0, args.submissions, max(int(1 / args.update_fraction), 1)) if args.update_fraction > 0 else []
+                    for idx in updated:
+                        repos.commit(idx)
+                    server.commits = repos.commits()
+
+                requests_before = server.requests
+                run_started = time.time()
+                elapsed = time.perf_counter()
+                Grader(config, "benchmark-token", log).grade()
+                elapsed = time.perf_counter() - elapsed
+
+                graded = graded_count(working_dir / "results.jsonl", run_started)
+                self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+                print(f"\nRun {run + 1}: {graded} results in {elapsed:.2f}s, {graded / elapsed * 60:.1f} submissions/min, {server.requests - requests_before} API requests")
+                print(f"Peak RSS: grader {self_rss:.1f} MiB, largest child {children_rss:.1f} MiB")
+                print(f"{'stage':<24} {'count':>7} {'total s':>10} {'mean ms':>10}")
+                for name, (count, total) in sorted(stage_times(working_dir / TRACE_FILE).items(), key=lambda item: -item[1][1]):
+                    print(f"{name:<24} {count:>7} {total:>10.3f} {total / count * 1000:>10.2f}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of GitHub payload decoding: the hand-written decoders of
+gh.structs against the dataclasses_json decoding they replaced.
+
+    python -m benchmarks.bench_structs --submissions 5000
+"""
+from dataclasses import fields, make_dataclass
+from dataclasses_json import dataclass_json
+from gh.structs import SubmissionInfo
+import argparse
+import timeit
+import tracemalloc
+
+
+def build_payload(n_submissions: int) -> list[dict]:
+    assignment = {
+        "id": 1, "public_repo": False, "title": "vector-sum", "type": "individual",
+        "invite_link": "https://classroom.github.com/a/example1", "invitations_enabled": True,
+        "slug": "vector-sum", "students_are_repo_admins": False, "feedback_pull_requests_enabled": False,
+        "max_teams": None, "max_members": None, "editor": None, "accepted": n_submissions,
+        "submissions": n_submissions, "passing": 0, "language": None, "deadline": None,
+        "classroom": {"id": 1, "name": "classroom", "archived": False, "url": "https://classroom.github.com/classrooms/1"},
+    }
+
+    return [{
+        "id": idx, "submitted": True, "passing": False, "commit_count": 3, "grade": None,
+        "students": [{"id": idx, "login": f"student{idx}", "name": None,
+                      "avatar_url": f"https://avatars.githubusercontent.com/u/{idx}",
+                      "html_url": f"https://github.com/student{idx}"}],
+        # Every submission carries its own copy, like the API does
+        "assignment": dict(assignment),
+        "repository": {"id": idx, "name": f"vector-sum-student{idx}", "full_name": f"org/vector-sum-student{idx}",
+                       "html_url": f"https://github.com/org/vector-sum-student{idx}", "node_id": f"R_{idx}",
+                       "private": True, "default_branch": "main"},
+    } for idx in range(n_submissions)]
+
+
+# Same fields as SubmissionInfo, decoded the way the previous dataclass_json structs were
+LegacySubmissionInfo = dataclass_json(make_dataclass("LegacySubmissionInfo", [(f.name, f.type) for f in fields(SubmissionInfo)]))
+
+
+def retained_bytes(decode) -> int:
+    # Memory still held by the decoded objects once the call returns
+    tracemalloc.start()
+    decoded = decode()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del decoded
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = build_payload(args.submissions)
+
+    candidates = {
+        "dataclasses_json": lambda: [LegacySubmissionInfo.from_dict(submission) for submission in payload],
+        "from_dict": lambda: [SubmissionInfo.from_dict(submission) for submission in payload],
+        "from_dicts (interned)": lambda: SubmissionInfo.from_dicts(payload),
+    }
+
+    baseline = None
+    for name, decode in candidates.items():
+        best = min(timeit.repeat(decode, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        retained = retained_bytes(decode) / 1024 / 1024
+        print(f"{name:<24} {best * 1000:9.2f} ms  {args.submissions / best:12.0f} submissions/s  {baseline / best:6.1f}x  {retained:7.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
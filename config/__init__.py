@@ -1,2 +1,2 @@
 from .parser import ConfigParser
-from .configs import ProgramConfig, AssignmentConfig, AssignmentTaskConfig
\ No newline at end of file
+from .configs import ProgramConfig, AssignmentConfig, AssignmentTaskConfig, CloneConfig, BenchmarkConfig, DaemonConfig
\ No newline at end of file
@@ -1,5 +1,5 @@
 from dataclasses_json import dataclass_json
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from typing import List, Optional, Any
 import hashlib
 import os
@@ -20,22 +20,84 @@ class SlurmBackendConfig:
         hasher.update(config_str.encode('utf-8'))
         return hasher.hexdigest()
 
+@dataclass_json
+@dataclass
+class LocalBackendConfig:
+    cpus: Optional[int] = None
+    mem_gb: Optional[float] = None
+    pin_cpus: bool = False
+
+    def assert_valid(self) -> None:
+        assert self.cpus is None or (isinstance(self.cpus, int) and self.cpus > 0), "cpus must be a positive integer"
+        assert self.mem_gb is None or (isinstance(self.mem_gb, (int, float)) and self.mem_gb > 0), "mem_gb must be a positive number"
+        assert isinstance(self.pin_cpus, bool), "pin_cpus must be a boolean"
+        assert not self.pin_cpus or self.cpus, "cpus must be provided when pin_cpus is enabled"
+
+@dataclass_json
+@dataclass
+class BenchmarkConfig:
+    trials: int = 1
+    pin_cores: Optional[int] = None
+    exclusive: bool = False
+    interleave: bool = True
+
+    def assert_valid(self) -> None:
+        assert isinstance(self.trials, int) and self.trials > 0, "trials must be a positive integer"
+        assert self.pin_cores is None or (isinstance(self.pin_cores, int) and self.pin_cores > 0), "pin_cores must be a positive integer"
+        assert isinstance(self.exclusive, bool), "exclusive must be a boolean"
+        assert isinstance(self.interleave, bool), "interleave must be a boolean"
+
 @dataclass_json
 @dataclass
 class AssignmentTaskConfig:
     name: str
     test_script_path: str
-    slurm_backend: SlurmBackendConfig
+    slurm_backend: SlurmBackendConfig = field(default_factory=lambda: SlurmBackendConfig(config={}))
     skip: bool = False
     blocking: bool = False
+    distribution: str = "rank0"
+    local_backend: LocalBackendConfig = field(default_factory=LocalBackendConfig)
+    stream_output: bool = False
+    stdout_limit_bytes: int = 1024 * 1024
+    stderr_limit_bytes: int = 64 * 1024
+    timeout_s: Optional[float] = None
+    mem_limit_mb: Optional[int] = None
+    cpu_time_limit_s: Optional[int] = None
+    max_processes: Optional[int] = None
+    warmup_runs: int = 0
+    max_cv: Optional[float] = None
+    noise_reruns: int = 1
+    max_noisy_runs: Optional[int] = 3
+    benchmark: BenchmarkConfig = field(default_factory=BenchmarkConfig)
+    depends_on: List[str] = field(default_factory=list)
 
     def assert_valid(self) -> None:
         assert isinstance(self.name, str) and self.name, "name must be a non-empty string"
         assert self.test_script_path, "test_script_path must be provided"
         assert os.path.exists(self.test_script_path), f"test_script_path {self.test_script_path} does not exist"
         self.slurm_backend.assert_valid()
+        self.local_backend.assert_valid()
+        self.benchmark.assert_valid()
         assert isinstance(self.skip, bool), "skip must be a boolean"
         assert isinstance(self.blocking, bool), "blocking must be a boolean"
+        assert isinstance(self.depends_on, list) and all(isinstance(dep, str) for dep in self.depends_on), "depends_on must be a list of task names"
+        assert self.name not in self.depends_on, "a task can't depend on itself"
+        assert isinstance(self.stream_output, bool), "stream_output must be a boolean"
+        assert isinstance(self.stdout_limit_bytes, int) and self.stdout_limit_bytes > 0, "stdout_limit_bytes must be a positive integer"
+        assert isinstance(self.stderr_limit_bytes, int) and self.stderr_limit_bytes > 0, "stderr_limit_bytes must be a positive integer"
+        assert self.distribution in ("rank0", "static", "dynamic"), "distribution must be one of 'rank0', 'static' or 'dynamic'"
+        assert self.timeout_s is None or (isinstance(self.timeout_s, (int, float)) and self.timeout_s > 0), "timeout_s must be a positive number"
+        assert self.mem_limit_mb is None or (isinstance(self.mem_limit_mb, int) and self.mem_limit_mb > 0), "mem_limit_mb must be a positive integer"
+        assert self.cpu_time_limit_s is None or (isinstance(self.cpu_time_limit_s, int) and self.cpu_time_limit_s > 0), "cpu_time_limit_s must be a positive integer"
+        assert self.max_processes is None or (isinstance(self.max_processes, int) and self.max_processes > 0), "max_processes must be a positive integer"
+        assert isinstance(self.warmup_runs, int) and self.warmup_runs >= 0, "warmup_runs must be a non-negative integer"
+        assert self.max_cv is None or (isinstance(self.max_cv, (int, float)) and self.max_cv > 0), "max_cv must be a positive number"
+        assert isinstance(self.noise_reruns, int) and self.noise_reruns >= 0, "noise_reruns must be a non-negative integer"
+        assert self.max_noisy_runs is None or (isinstance(self.max_noisy_runs, int) and self.max_noisy_runs > 0), "max_noisy_runs must be a positive integer"
+
+    def benchmarking(self) -> bool:
+        """Whether the task asks for reproducible timings, see `benchmark` and `local_backend.pin_cpus`."""
+        return self.benchmark.trials > 1 or bool(self.benchmark.pin_cores) or self.benchmark.exclusive or self.local_backend.pin_cpus
 
     def performance_hash(self) -> str:
         # Create a hash based on relevant fields for performance comparison
@@ -53,8 +115,39 @@ class AssignmentTaskConfig:
 
         # Include slurm_backend config in the hash
         hasher.update(self.slurm_backend.performance_hash().encode('utf-8'))
+
+        # Only hashed when set, so that existing caches stay valid for SLURM-only configs
+        if self.local_backend != LocalBackendConfig():
+            hasher.update(str(sorted(self.local_backend.to_dict().items())).encode('utf-8'))
+        if self.warmup_runs or self.max_cv is not None:
+            hasher.update(f"{self.warmup_runs}:{self.max_cv}:{self.noise_reruns}".encode('utf-8'))
+        if self.benchmark != BenchmarkConfig():
+            hasher.update(str(sorted(self.benchmark.to_dict().items())).encode('utf-8'))
         return hasher.hexdigest()
 
+    def legacy_performance_hash(self) -> str:
+        # The per-task JSON caches were written from inside the SLURM job, after the old
+        # runner had filled in the job name and disabled srun on the submitted config
+        config = dict(self.slurm_backend.config or {})
+        if not config.get("slurm_job_name"):
+            config["slurm_job_name"] = f"grading_{self.name}"
+        config["slurm_use_srun"] = False
+        return replace(self, slurm_backend=SlurmBackendConfig(config)).performance_hash()
+
+@dataclass_json
+@dataclass
+class CloneConfig:
+    depth: Optional[int] = None
+    filter: Optional[str] = None
+    single_branch: bool = False
+    sparse_checkout: Optional[List[str]] = None
+
+    def assert_valid(self) -> None:
+        assert self.depth is None or (isinstance(self.depth, int) and self.depth > 0), "depth must be a positive integer"
+        assert self.filter is None or (isinstance(self.filter, str) and self.filter), "filter must be a non-empty string"
+        assert isinstance(self.single_branch, bool), "single_branch must be a boolean"
+        assert self.sparse_checkout is None or (isinstance(self.sparse_checkout, list) and self.sparse_checkout), "sparse_checkout must be a non-empty list of patterns"
+
 @dataclass_json
 @dataclass
 class AssignmentConfig:
@@ -64,7 +157,7 @@ class AssignmentConfig:
     id: Optional[int] = None
     preserve_repo_files: bool = False
     tasks: List[AssignmentTaskConfig] = None
-
+    clone: CloneConfig = field(default_factory=CloneConfig)
 
     def assert_valid(self) -> None:
         assert isinstance(self.name, str) and self.name, "name must be a non-empty string"
@@ -73,11 +166,62 @@ class AssignmentConfig:
         assert isinstance(self.tasks, list) and self.tasks, "tasks must be a non-empty list"
         for task in self.tasks:
             task.assert_valid()
+        self.clone.assert_valid()
 
         # assert no duplicate task names
         task_names = [task.name for task in self.tasks]
         assert len(task_names) == len(set(task_names)), f"Duplicate task names found in assignment {self.name}"
 
+        for task in self.tasks:
+            unknown = set(task.depends_on) - set(task_names)
+            assert not unknown, f"Task {task.name} of assignment {self.name} depends on unknown tasks {sorted(unknown)}"
+        self.__assert_acyclic()
+
+    def task_dependencies(self, task: AssignmentTaskConfig) -> list[str]:
+        """Explicit depends_on edges plus every earlier blocking task, which used to hold back all later ones."""
+        dependencies = list(task.depends_on)
+        for earlier in self.tasks[:self.tasks.index(task)]:
+            if earlier.blocking and earlier.name not in dependencies:
+                dependencies.append(earlier.name)
+        return dependencies
+
+    def __assert_acyclic(self) -> None:
+        tasks = {task.name: task for task in self.tasks}
+        visiting, visited = set(), set()
+
+        def visit(name: str) -> None:
+            assert name not in visiting, f"Circular depends_on involving task {name} in assignment {self.name}"
+            if name in visited:
+                return
+            visiting.add(name)
+            for dependency in self.task_dependencies(tasks[name]):
+                visit(dependency)
+            visiting.remove(name)
+            visited.add(name)
+
+        for name in tasks:
+            visit(name)
+
+@dataclass_json
+@dataclass
+class DaemonConfig:
+    host: str = "127.0.0.1"
+    port: int = 8080
+    webhook_path: str = "/webhook"
+    webhook_secret: Optional[str] = None
+    poll_interval_s: float = 900.0
+    debounce_s: float = 30.0
+    max_debounce_s: float = 300.0
+
+    def assert_valid(self) -> None:
+        assert isinstance(self.host, str) and self.host, "host must be a non-empty string"
+        assert isinstance(self.port, int) and 0 <= self.port < 65536, "port must be an integer between 0 and 65535"
+        assert isinstance(self.webhook_path, str) and self.webhook_path.startswith("/"), "webhook_path must start with '/'"
+        assert self.webhook_secret is None or isinstance(self.webhook_secret, str), "webhook_secret must be a string"
+        assert isinstance(self.poll_interval_s, (int, float)) and self.poll_interval_s > 0, "poll_interval_s must be a positive number"
+        assert isinstance(self.debounce_s, (int, float)) and self.debounce_s >= 0, "debounce_s must be a non-negative number"
+        assert isinstance(self.max_debounce_s, (int, float)) and self.max_debounce_s >= self.debounce_s, "max_debounce_s must be at least debounce_s"
+
 @dataclass_json
 @dataclass
 class GraderConfig:
@@ -85,11 +229,33 @@ class GraderConfig:
     grades_file: str
     sentry_dsn: Optional[str] = None
     github_pat: Optional[str] = None
+    probe_concurrency: int = 16
+    runner: str = "slurm"
+    local_workers: Optional[int] = None
+    assignment_index_ttl_s: int = 3600
+    http_cache: bool = True
+    prefetch_depth: int = 1
+    prefetch_disk_budget_mb: Optional[int] = None
+    telemetry: bool = True
+    github_api_url: str = "https://api.github.com"
+    scheduler_poll_s: float = 2.0
+    daemon: DaemonConfig = field(default_factory=DaemonConfig)
 
     def assert_valid(self) -> None:
         assert isinstance(self.working_dir, str) and self.working_dir, "working_dir must be a non-empty string"
         assert path.exists(self.working_dir), f"working_dir {self.working_dir} does not exist"
         assert isinstance(self.grades_file, str) and self.grades_file, "grades_file must be a non-empty string"
+        assert isinstance(self.probe_concurrency, int) and self.probe_concurrency > 0, "probe_concurrency must be a positive integer"
+        assert self.runner in ("slurm", "slurm_array", "local"), "runner must be one of 'slurm', 'slurm_array' or 'local'"
+        assert isinstance(self.assignment_index_ttl_s, (int, float)) and self.assignment_index_ttl_s >= 0, "assignment_index_ttl_s must be a non-negative number"
+        assert isinstance(self.http_cache, bool), "http_cache must be a boolean"
+        assert self.local_workers is None or (isinstance(self.local_workers, int) and self.local_workers > 0), "local_workers must be a positive integer"
+        assert isinstance(self.prefetch_depth, int) and self.prefetch_depth >= 0, "prefetch_depth must be a non-negative integer"
+        assert isinstance(self.telemetry, bool), "telemetry must be a boolean"
+        assert isinstance(self.scheduler_poll_s, (int, float)) and self.scheduler_poll_s > 0, "scheduler_poll_s must be a positive number"
+        assert isinstance(self.github_api_url, str) and self.github_api_url.startswith(("http://", "https://")), "github_api_url must be an http(s) URL"
+        assert self.prefetch_disk_budget_mb is None or (isinstance(self.prefetch_disk_budget_mb, int) and self.prefetch_disk_budget_mb > 0), "prefetch_disk_budget_mb must be a positive integer"
+        self.daemon.assert_valid()
 
 @dataclass_json
 @dataclass
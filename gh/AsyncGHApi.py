@@ -0,0 +1,146 @@
+import asyncio
+import httpx
+from .exceptions import GitHubException
+from .structs import ClassroomInfo, AssignmentInfo, SubmissionInfo
+from .filters import By
+from typing import Any, Optional
+from urllib.parse import urlparse, parse_qs
+
+
+class AsyncGithubClassroomAPI:
+    """
+    asyncio counterpart of GithubClassroomAPI for high fan-out metadata fetching.
+    Requests share a pool of HTTP/1.1 keep-alive connections and at most
+    `max_concurrency` of them are in flight at once.
+
+        async with AsyncGithubClassroomAPI(token) as api:
+            submissions = await asyncio.gather(*[api.get_submissions_for_assignment(i) for i in ids])
+    """
+    PER_PAGE = 100
+
+    def __init__(self, token: str, timeout: int = 30, max_retries: int = 3, max_concurrency: int = 16, base_url: str = "https://api.github.com") -> None:
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.client = self.__setup_client(max_retries)
+        self.__semaphore = asyncio.Semaphore(max_concurrency)
+
+    def __setup_client(self, max_retries: int) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=False,
+            timeout=self.timeout,
+            # Retries connection failures only, like the connect part of the sync client's Retry
+            transport=httpx.AsyncHTTPTransport(
+                retries=max_retries,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+            ),
+            headers={
+                "Authorization": f"Bearer {self.token}",
+                "Accept": "application/vnd.github.v3+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+                "User-Agent": "GithubClassroomAPI-Client <githubclassroomapi@francescodb.it>"
+            },
+        )
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "AsyncGithubClassroomAPI":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    async def __get_response(self, *paths: str, query: Optional[dict] = None) -> httpx.Response:
+        url = "/".join([self.base_url] + list(paths))
+        try:
+            async with self.__semaphore:
+                response = await self.client.get(url, params=query)
+            response.raise_for_status()
+        except httpx.TimeoutException:
+            raise GitHubException(f"Request to {url} timed out after {self.timeout}s")
+        except httpx.HTTPStatusError as e:
+            raise GitHubException(f"GET request to {url} failed with status {e.response.status_code}: {e.response.text}")
+        except httpx.HTTPError as e:
+            raise GitHubException(f"Request to {url} failed: {e}")
+
+        return response
+
+    async def __get_request(self, *paths: str, query: Optional[dict] = None) -> Any:
+        response = await self.__get_response(*paths, query=query)
+        return response.json()
+
+    @staticmethod
+    def __last_page(response: httpx.Response) -> Optional[int]:
+        last = response.links.get("last")
+        if not last:
+            return None
+        page = parse_qs(urlparse(last["url"]).query).get("page")
+        return int(page[0]) if page else None
+
+    async def __get_paginated_request(self, *paths: str) -> list:
+        response = await self.__get_response(*paths, query={"page": 1, "per_page": self.PER_PAGE})
+        page = response.json()
+        data = list(page)
+        last_page = self.__last_page(response)
+
+        if last_page is None:
+            page_idx = 1
+            while len(page) == self.PER_PAGE:
+                page_idx += 1
+                page = await self.__get_request(*paths, query={"page": page_idx, "per_page": self.PER_PAGE})
+                data.extend(page)
+            return data
+
+        pages = await asyncio.gather(*[
+            self.__get_request(*paths, query={"page": page_idx, "per_page": self.PER_PAGE})
+            for page_idx in range(2, last_page + 1)
+        ])
+        for page in pages:
+            data.extend(page)
+
+        return data
+
+    async def list_classrooms(self) -> list[ClassroomInfo]:
+        response = await self.__get_paginated_request("classrooms")
+
+        return [ClassroomInfo.from_dict(classroom) for classroom in response]
+
+    async def get_classroom_assignments(self, classroom_id: int) -> list[AssignmentInfo]:
+        response = await self.__get_paginated_request("classrooms", str(classroom_id), "assignments")
+
+        return [AssignmentInfo.from_dict(assignment) for assignment in response]
+
+    async def get_submissions_for_assignment(self, assignment_id: int) -> list[SubmissionInfo]:
+        response = await self.__get_paginated_request("assignments", str(assignment_id), "accepted_assignments")
+
+        return SubmissionInfo.from_dicts(response)
+
+    async def get_assignment_by_id(self, assignment_id: int) -> AssignmentInfo:
+        response = await self.__get_request("assignments", str(assignment_id))
+
+        return AssignmentInfo.from_dict(response)
+
+    async def get_latest_commit_hash(self, repository_full_name: str, branch: str) -> str:
+        response = await self.__get_request("repos", repository_full_name, "git", "ref", "heads", branch)
+
+        return response["object"]["sha"]
+
+    async def get_assignment_by(self, by: By, value: Any) -> AssignmentInfo:
+        if by not in {By.ID, By.TITLE, By.INVITE_LINK, By.SLUG}:
+            raise ValueError(f"Invalid 'by' parameter. Accepted values are: {[f.value for f in (By.ID, By.TITLE, By.INVITE_LINK, By.SLUG)]}")
+
+        if by == By.ID:
+            return await self.get_assignment_by_id(int(value))
+
+        # Every classroom is listed at the same time, keeping the classroom order for ties
+        classrooms = await self.list_classrooms()
+        assignments = await asyncio.gather(*[self.get_classroom_assignments(classroom.id) for classroom in classrooms])
+
+        for classroom_assignments in assignments:
+            for assignment in classroom_assignments:
+                if assignment.__getattribute__(by.value) == value:
+                    return assignment
+
+        raise GitHubException(f"Classroom with {by.value} '{value}' not found.")
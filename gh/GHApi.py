@@ -1,18 +1,48 @@
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse, parse_qs
 from urllib3.util.retry import Retry
 from .exceptions import GitHubException
 from .structs import ClassroomInfo, AssignmentInfo, SubmissionInfo
 from .filters import By
+from .index import AssignmentIndex
+from .http_cache import ResponseCache
+from .ratelimit import RateLimiter
+from pathlib import Path
 from typing import Iterator, Any, Optional
+import threading
+from telemetry import telemetry
 
 
 class GithubClassroomAPI:
-    def __init__(self, token: str, timeout: int = 30, max_retries: int = 3) -> None:
+    PER_PAGE = 100
+    # An unknown assignment rebuilds the index, at most this often (seconds)
+    INDEX_REBUILD_INTERVAL = 60
+
+    def __init__(self, token: str, timeout: int = 30, max_retries: int = 3, cache_dir: Optional[str] = None, index_ttl: float = 3600, http_cache: bool = True, page_concurrency: int = 8, base_url: str = "https://api.github.com") -> None:
         self.token = token
-        self.base_url = "https://api.github.com"
+        self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        self.page_concurrency = page_concurrency
+        self.max_retries = max_retries
         self.session = self.__setup_request_session(max_retries)
+        self.rate_limiter = RateLimiter()
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.index_ttl = index_ttl
+        self.__assignment_index: Optional[AssignmentIndex] = None
+        # Assignments may be looked up from several threads, only one of them builds the index
+        self.__index_lock = threading.Lock()
+        self.response_cache = ResponseCache(self.cache_dir / "http") if self.cache_dir and http_cache else None
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_GithubClassroomAPI__index_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.__index_lock = threading.Lock()
     
     def __setup_request_session(self, max_retries: int) -> requests.Session:
         session = requests.Session()
@@ -21,10 +51,14 @@ class GithubClassroomAPI:
         retry_strategy = Retry(
             total=max_retries,
             backoff_factor=1.0,  # Exponential backoff: 1s, 2s, 4s...
-            status_forcelist=[429, 500, 502, 503, 504],
+            # Rate limited answers (403/429) are left to the rate limiter, which shares the wait with every thread.
+            # urllib3 would still retry any 429 carrying Retry-After on its own unless told not to
+            status_forcelist=[500, 502, 503, 504],
+            respect_retry_after_header=False,
             allowed_methods=["GET", "POST", "PUT", "DELETE", "HEAD", "OPTIONS", "TRACE"]
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # Keep enough pooled connections for concurrent page fetches
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=max(self.page_concurrency, 10))
         session.mount("https://", adapter)
         session.mount("http://", adapter)
 
@@ -47,35 +81,93 @@ class GithubClassroomAPI:
             return wrapper
         return decorator
 
-    def __get_paginated_request(self, *paths: str) -> list:
-        data = []
-        page_idx = 1
+    @staticmethod
+    def __last_page(headers: dict[str, str]) -> Optional[int]:
+        link = headers.get("Link")
+        if not link:
+            return None
+
+        for relation in requests.utils.parse_header_links(link):
+            if relation.get("rel") == "last":
+                page = parse_qs(urlparse(relation["url"]).query).get("page")
+                return int(page[0]) if page else None
 
-        response = self.__get_request(*paths, query={"page": page_idx, "per_page": 50})
-        data.extend(response)
+        return None
 
-        while response:
+    def __get_page(self, paths: tuple[str, ...], page_idx: int) -> list:
+        return self.__get_request(*paths, query={"page": page_idx, "per_page": self.PER_PAGE})
+
+    def __get_paginated_request(self, *paths: str) -> list:
+        response, headers = self.__get_response(*paths, query={"page": 1, "per_page": self.PER_PAGE})
+        data = list(response)
+        last_page = self.__last_page(headers) or 1
+
+        pages = range(2, last_page + 1)
+        if pages:
+            with ThreadPoolExecutor(max_workers=min(self.page_concurrency, len(pages))) as pool:
+                for response in pool.map(lambda page_idx: self.__get_page(paths, page_idx), pages):
+                    data.extend(response)
+
+        # The Link header may be missing, or replayed from the cache on a 304 and thus
+        # stale: walk the pages past it until a partial one shows up
+        page_idx = last_page
+        while len(response) == self.PER_PAGE:
             page_idx += 1
-            response = self.__get_request(*paths, query={"page": page_idx, "per_page": 50})
+            response = self.__get_page(paths, page_idx)
             data.extend(response)
 
         return data
 
-    def __get_request(self, *paths: str, query: Optional[dict] = None) -> requests.Response:
+    def __get_request(self, *paths: str, query: Optional[dict] = None) -> Any:
+        body, _ = self.__get_response(*paths, query=query)
+        return body
+
+    def __get_response(self, *paths: str, query: Optional[dict] = None) -> tuple[Any, dict[str, str]]:
         url = "/".join([self.base_url] + list(paths))
+        entry = self.response_cache.lookup(url, query) if self.response_cache else None
         try:
-            response = self.session.get(url, params=query, timeout=self.timeout)
+            for attempt in range(self.max_retries + 1):
+                # Paces requests ahead of time when the quota runs low, waits out Retry-After answers
+                with telemetry.span("github.ratelimit_wait"):
+                    self.rate_limiter.acquire()
+                with telemetry.span("github.request", path="/".join(paths)):
+                    try:
+                        response = self.session.get(url, params=query, timeout=self.timeout, headers=ResponseCache.conditional_headers(entry))
+                    except requests.exceptions.RequestException:
+                        self.rate_limiter.release()
+                        raise
+                telemetry.count("github.requests")
+                if not self.rate_limiter.update(response.headers, response.status_code) or attempt == self.max_retries:
+                    break
+                telemetry.count("github.retries")
             response.raise_for_status()
         except requests.exceptions.ConnectionError as e:
             raise GitHubException(f"Connection error while fetching {url}: {e}")
         except requests.exceptions.Timeout:
             raise GitHubException(f"Request to {url} timed out after {self.timeout}s")
-        except requests.exceptions.HTTPError as e:
+        except requests.exceptions.HTTPError:
             raise GitHubException(f"GET request to {url} failed with status {response.status_code}: {response.text}")
         except requests.exceptions.RequestException as e:
             raise GitHubException(f"Request to {url} failed: {e}")
 
-        return response.json()
+        if response.status_code == 304 and entry is not None:
+            telemetry.count("github.not_modified")
+            self.response_cache.hit()
+            return entry["body"], entry["headers"]
+
+        body = response.json()
+        if self.response_cache:
+            self.response_cache.store(url, query, response.headers, body)
+
+        return body, response.headers
+
+    @property
+    def quota(self) -> dict[str, Any]:
+        return self.rate_limiter.quota
+
+    @property
+    def cache_stats(self) -> dict[str, int]:
+        return self.response_cache.stats if self.response_cache else {"hits": 0, "misses": 0}
 
     def list_classrooms(self) -> list[ClassroomInfo]:
         response = self.__get_paginated_request("classrooms")
@@ -110,38 +202,70 @@ class GithubClassroomAPI:
     def get_submissions_for_assignment(self, assignment_id: int) -> list[SubmissionInfo]:
         response = self.__get_paginated_request("assignments", str(assignment_id), "accepted_assignments")
 
-        return [SubmissionInfo.from_dict(submission) for submission in response]
+        return SubmissionInfo.from_dicts(response)
 
     def get_assignment_by_id(self, assignment_id: int) -> AssignmentInfo:
         response = self.__get_request("assignments", str(assignment_id))
 
         return AssignmentInfo.from_dict(response)
 
+    def get_latest_commit_hash(self, repository_full_name: str, branch: str) -> str:
+        # The ref endpoint only returns the SHA, /commits/{ref} would send (and cache) the whole commit with its patches
+        response = self.__get_request("repos", repository_full_name, "git", "ref", "heads", branch)
+
+        return response["object"]["sha"]
+
+    def __build_assignment_index(self) -> AssignmentIndex:
+        assignments = [assignment for classroom in self.list_classrooms() for assignment in self.get_classroom_assignments(classroom.id)]
+        index = AssignmentIndex(assignments)
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            index.save(self.cache_dir / "assignment_index.json")
+
+        return index
+
+    def __get_assignment_index(self) -> AssignmentIndex:
+        if self.__assignment_index is None and self.cache_dir:
+            self.__assignment_index = AssignmentIndex.load(self.cache_dir / "assignment_index.json")
+
+        if self.__assignment_index is None or self.__assignment_index.is_expired(self.index_ttl):
+            self.__assignment_index = self.__build_assignment_index()
+
+        return self.__assignment_index
+
+    def __find_assignments(self, by: By, value: Any) -> list[AssignmentInfo]:
+        with self.__index_lock:
+            found = self.__get_assignment_index().find(by, value)
+
+            # The assignment may have been created after the index was built, e.g. while the daemon runs
+            if not found and self.__assignment_index.is_expired(self.INDEX_REBUILD_INTERVAL):
+                self.__assignment_index = self.__build_assignment_index()
+                found = self.__assignment_index.find(by, value)
+
+        return found
+
     @__filter_checker({By.ID, By.TITLE, By.INVITE_LINK, By.SLUG})
     def get_assignment_by(self, by: By, value: Any) -> AssignmentInfo:
         if by == By.ID:
-            return self.get_assignment_by_id(int(value))
+            # A single request is cheaper than listing every classroom when there is no index yet
+            found = self.__assignment_index.find(by, value) if self.__assignment_index else []
+            return found[0] if found else self.get_assignment_by_id(int(value))
 
-        classrooms = self.list_classrooms()
-
-        for classroom in classrooms:
-            for assignment in self.get_classroom_assignments(classroom.id):
-                if assignment.__getattribute__(by.value) == value:
-                    return assignment
+        found = self.__find_assignments(by, value)
+        if found:
+            return found[0]
 
         raise GitHubException(f"Classroom with {by.value} '{value}' not found.")
 
     @__filter_checker({By.ID, By.TITLE, By.INVITE_LINK, By.SLUG})
     def get_assignments_by(self, by: By, value: str) -> Iterator[AssignmentInfo]:
         if by == By.ID:
-            yield self.get_assignment_by_id(int(value))
+            yield self.get_assignment_by(by, value)
             return
 
-        classrooms = self.list_classrooms()
+        found = self.__find_assignments(by, value)
+        if not found:
+            raise GitHubException(f"Classroom with {by.value} '{value}' not found.")
 
-        for classroom in classrooms:
-            for assignment in self.get_classroom_assignments(classroom.id):
-                if assignment.__getattribute__(by.value) == value:
-                    yield assignment
-
-        raise GitHubException(f"Classroom with {by.value} '{value}' not found.")
+        yield from found
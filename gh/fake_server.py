@@ -0,0 +1,134 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import urlparse, parse_qs
+import hashlib
+import json
+import re
+import threading
+import time
+
+
+class FakeClassroomServer:
+    """
+    Local stand-in for the GitHub Classroom REST API, serving the subset of
+    endpoints used by the clients (paginated with Link headers, ETag aware).
+    Meant for offline testing and benchmarking:
+
+        with FakeClassroomServer(classrooms, assignments, submissions) as server:
+            api = GithubClassroomAPI("token", base_url=server.url)
+    """
+    def __init__(
+        self,
+        classrooms: list[dict],
+        assignments: dict[int, list[dict]],
+        submissions: dict[int, list[dict]],
+        commits: Optional[dict[str, str]] = None,
+        latency_s: float = 0.0,
+    ) -> None:
+        self.classrooms = classrooms
+        self.assignments = assignments
+        self.submissions = submissions
+        self.commits = commits or {}
+        self.latency_s = latency_s
+        self.requests = 0
+        self.__lock = threading.Lock()
+        self.__server: Optional[ThreadingHTTPServer] = None
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __route(self, path: str) -> Any:
+        if path == "/classrooms":
+            return self.classrooms
+        if match := re.fullmatch(r"/classrooms/(\d+)/assignments", path):
+            return self.assignments.get(int(match[1]))
+        if match := re.fullmatch(r"/assignments/(\d+)/accepted_assignments", path):
+            return self.submissions.get(int(match[1]))
+        if match := re.fullmatch(r"/assignments/(\d+)", path):
+            found = [a for assignments in self.assignments.values() for a in assignments if a["id"] == int(match[1])]
+            return found[0] if found else None
+        if match := re.fullmatch(r"/repos/([^/]+/[^/]+)/git/ref/heads/(.+)", path):
+            sha = self.commits.get(match[1])
+            return {"ref": f"refs/heads/{match[2]}", "object": {"sha": sha, "type": "commit"}} if sha else None
+        return None
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        with self.__lock:
+            self.requests += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+        url = urlparse(handler.path)
+        body = self.__route(url.path)
+        if body is None:
+            handler.send_response(404)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        headers = {}
+        if isinstance(body, list):
+            query = parse_qs(url.query)
+            page = int(query.get("page", ["1"])[0])
+            per_page = int(query.get("per_page", ["30"])[0])
+            last_page = max((len(body) + per_page - 1) // per_page, 1)
+            body = body[(page - 1) * per_page:page * per_page]
+            if last_page > 1:
+                base = f"{self.url}{url.path}?per_page={per_page}"
+                links = [f'<{base}&page={last_page}>; rel="last"']
+                if page < last_page:
+                    links.insert(0, f'<{base}&page={page + 1}>; rel="next"')
+                headers["Link"] = ", ".join(links)
+
+        payload = json.dumps(body).encode("utf-8")
+        etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+        if handler.headers.get("If-None-Match") == etag:
+            handler.send_response(304)
+            handler.send_header("ETag", etag)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.send_header("ETag", etag)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def start(self) -> "FakeClassroomServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so that clients can reuse pooled connections
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                server._handle(self)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self.__server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self.__server:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+    def __enter__(self) -> "FakeClassroomServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
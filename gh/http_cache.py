@@ -0,0 +1,85 @@
+from pathlib import Path
+from typing import Any, Optional
+import hashlib
+import json
+import os
+import threading
+
+
+class ResponseCache:
+    """
+    Disk-persisted cache of GET response bodies validated through ETag and
+    Last-Modified. GitHub doesn't count 304 answers against the primary rate
+    limit, so revalidating an unchanged page is free.
+    """
+    # Response headers that must survive a 304, e.g. for pagination
+    KEPT_HEADERS = ("Link",)
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_ResponseCache__lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __entry_path(self, url: str, query: Optional[dict]) -> Path:
+        key = url + "?" + json.dumps(sorted((query or {}).items()))
+        return self.directory / (hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def lookup(self, url: str, query: Optional[dict]) -> Optional[dict[str, Any]]:
+        try:
+            with open(self.__entry_path(url, query), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def conditional_headers(entry: Optional[dict[str, Any]]) -> dict[str, str]:
+        if not entry:
+            return {}
+
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def hit(self) -> None:
+        with self.__lock:
+            self.hits += 1
+
+    def store(self, url: str, query: Optional[dict], headers: dict[str, str], body: Any) -> None:
+        with self.__lock:
+            self.misses += 1
+
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+
+        entry = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "headers": {name: headers[name] for name in self.KEPT_HEADERS if name in headers},
+            "body": body,
+        }
+
+        path = self.__entry_path(url, query)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,48 @@
+from .structs import AssignmentInfo
+from .filters import By
+from pathlib import Path
+from typing import Any, Optional
+import json
+import time
+import os
+
+
+class AssignmentIndex:
+    """
+    In-memory index of every assignment of every classroom, keyed by all the
+    attributes assignments can be looked up by. Built in one listing pass and
+    optionally persisted on disk so that later runs skip the listing entirely.
+    """
+    KEYS = (By.ID, By.SLUG, By.INVITE_LINK, By.TITLE)
+
+    def __init__(self, assignments: list[AssignmentInfo], created_at: Optional[float] = None) -> None:
+        self.assignments = assignments
+        self.created_at = created_at if created_at is not None else time.time()
+        self.__index: dict[By, dict[Any, list[AssignmentInfo]]] = {by: {} for by in self.KEYS}
+
+        for assignment in assignments:
+            for by in self.KEYS:
+                self.__index[by].setdefault(assignment.__getattribute__(by.value), []).append(assignment)
+
+    def find(self, by: By, value: Any) -> list[AssignmentInfo]:
+        if by == By.ID:
+            value = int(value)
+        return self.__index[by].get(value, [])
+
+    def is_expired(self, ttl: float) -> bool:
+        return time.time() - self.created_at > ttl
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"created_at": self.created_at, "assignments": [assignment.to_dict() for assignment in self.assignments]}, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path: Path) -> Optional["AssignmentIndex"]:
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            return AssignmentIndex([AssignmentInfo.from_dict(assignment) for assignment in data["assignments"]], data["created_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
@@ -0,0 +1,130 @@
+from typing import Any, Mapping, Optional
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket fed by GitHub's X-RateLimit-* headers and shared by every thread
+    using the client. Requests go through untouched while the quota is healthy;
+    once fewer than `pace_below` of the requests are left, the remaining ones are
+    spread evenly until the window resets instead of burning the budget and then
+    stalling. Retry-After answers block every caller for the requested time.
+
+    The server's X-RateLimit-Remaining is the source of truth, only the requests
+    still in flight are deducted from it locally. Conditional requests answered
+    with 304 Not Modified don't count against the quota and leave it untouched.
+    """
+    def __init__(self, pace_below: float = 0.2) -> None:
+        self.pace_below = pace_below
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.waited_s = 0.0
+        self.__server_remaining: Optional[int] = None
+        self.__in_flight = 0
+        self.__next_slot = 0.0
+        self.__lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_RateLimiter__lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __delay(self, now: float) -> float:
+        start = max(now, self.blocked_until)
+
+        if self.remaining is None or self.limit is None or now >= self.reset_at:
+            return start - now
+
+        if self.remaining <= 0:
+            return max(start, self.reset_at) - now
+
+        if self.remaining < self.limit * self.pace_below:
+            interval = (self.reset_at - now) / self.remaining
+            start = max(start, self.__next_slot)
+            self.__next_slot = start + interval
+
+        return start - now
+
+    def __estimate(self) -> None:
+        if self.__server_remaining is not None:
+            self.remaining = max(self.__server_remaining - self.__in_flight, 0)
+
+    def acquire(self) -> None:
+        with self.__lock:
+            now = time.time()
+            delay = self.__delay(now)
+            self.requests += 1
+            # Claim the token right away so concurrent callers see the reduced budget
+            self.__in_flight += 1
+            self.__estimate()
+            if delay > 0:
+                self.throttled += 1
+                self.waited_s += delay
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self) -> None:
+        """Gives back the token of a request that failed without a response."""
+        with self.__lock:
+            self.__in_flight = max(self.__in_flight - 1, 0)
+            self.__estimate()
+
+    def update(self, headers: Mapping[str, str], status_code: int) -> bool:
+        """
+        Refreshes the quota from a response, returns whether the request was rejected
+        because of rate limiting and should be retried.
+        """
+        now = time.time()
+
+        with self.__lock:
+            self.__in_flight = max(self.__in_flight - 1, 0)
+            if "X-RateLimit-Limit" in headers:
+                self.limit = int(headers["X-RateLimit-Limit"])
+            new_window = False
+            if "X-RateLimit-Reset" in headers:
+                reset_at = float(headers["X-RateLimit-Reset"])
+                new_window = reset_at > self.reset_at
+                self.reset_at = max(self.reset_at, reset_at)
+            if "X-RateLimit-Remaining" in headers:
+                remaining = int(headers["X-RateLimit-Remaining"])
+                # The server's count only goes down within a window, the lowest value is the newest one
+                # even when responses of concurrent requests arrive out of order
+                if self.__server_remaining is None or new_window:
+                    self.__server_remaining = remaining
+                else:
+                    self.__server_remaining = min(self.__server_remaining, remaining)
+            self.__estimate()
+
+            if status_code not in (403, 429):
+                return False
+
+            if "Retry-After" in headers:
+                self.blocked_until = max(self.blocked_until, now + float(headers["Retry-After"]))
+                return True
+
+            if self.remaining == 0:
+                self.blocked_until = max(self.blocked_until, self.reset_at)
+                return True
+
+        return False
+
+    @property
+    def quota(self) -> dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset_at": self.reset_at,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "waited_s": self.waited_s,
+        }
@@ -1,19 +1,26 @@
-from dataclasses import dataclass
-from dataclasses_json import dataclass_json
+from dataclasses import dataclass, asdict
 from typing import Optional, List
 
-@dataclass_json
-@dataclass
+# Payloads are decoded by hand: dataclasses_json reflection was the main cost
+# when loading thousands of submissions. Unknown keys are ignored.
+
+@dataclass(slots=True)
 class ClassroomInfo:
     id: int
     name: str
     archived: bool
     url: str
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "ClassroomInfo":
+        return cls(data["id"], data["name"], data["archived"], data["url"])
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
 
 # Dataclass per rappresentare un Assignment (senza il campo "classroom")
-@dataclass_json
-@dataclass
+@dataclass(slots=True)
 class AssignmentInfo:
     id: int
     public_repo: bool
@@ -33,9 +40,33 @@ class AssignmentInfo:
     language: Optional[str]
     deadline: Optional[str]
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "AssignmentInfo":
+        return cls(
+            data["id"],
+            data["public_repo"],
+            data["title"],
+            data["type"],
+            data["invite_link"],
+            data["invitations_enabled"],
+            data["slug"],
+            data["students_are_repo_admins"],
+            data["feedback_pull_requests_enabled"],
+            data.get("max_teams"),
+            data.get("max_members"),
+            data.get("editor"),
+            data["accepted"],
+            data["submissions"],
+            data["passing"],
+            data.get("language"),
+            data.get("deadline"),
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
 
-@dataclass_json
-@dataclass
+
+@dataclass(slots=True)
 class StudentInfo:
     id: int
     login: str
@@ -43,9 +74,15 @@ class StudentInfo:
     avatar_url: str
     html_url: str
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "StudentInfo":
+        return cls(data["id"], data["login"], data.get("name"), data["avatar_url"], data["html_url"])
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
 
-@dataclass_json
-@dataclass
+@dataclass(slots=True)
 class RepositoryInfo:
     id: int
     name: str
@@ -55,10 +92,16 @@ class RepositoryInfo:
     private: bool
     default_branch: str
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "RepositoryInfo":
+        return cls(data["id"], data["name"], data["full_name"], data["html_url"], data["node_id"], data["private"], data["default_branch"])
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
 
 # Rappresenta una Submission, referenzia AssignmentInfo e ignora il campo 'classroom' in input
-@dataclass_json
-@dataclass
+@dataclass(slots=True)
 class SubmissionInfo:
     id: int
     submitted: bool
@@ -69,6 +112,41 @@ class SubmissionInfo:
     assignment: AssignmentInfo
     repository: RepositoryInfo
 
+    @classmethod
+    def from_dict(cls, data: dict, assignments: Optional[dict[int, AssignmentInfo]] = None) -> "SubmissionInfo":
+        """
+        `assignments` interns the embedded assignment by id: submissions of the same
+        listing share a single AssignmentInfo instead of one copy each.
+        """
+        raw_assignment = data["assignment"]
+
+        if assignments is None:
+            assignment = AssignmentInfo.from_dict(raw_assignment)
+        else:
+            assignment = assignments.get(raw_assignment["id"])
+            if assignment is None:
+                assignment = assignments[raw_assignment["id"]] = AssignmentInfo.from_dict(raw_assignment)
+
+        return cls(
+            data["id"],
+            data["submitted"],
+            data["passing"],
+            data["commit_count"],
+            data.get("grade"),
+            [StudentInfo.from_dict(student) for student in data["students"]],
+            assignment,
+            RepositoryInfo.from_dict(data["repository"]),
+        )
+
+    @classmethod
+    def from_dicts(cls, data: list[dict]) -> list["SubmissionInfo"]:
+        # Only within one listing: every submission of a response embeds the same assignment snapshot
+        assignments: dict[int, AssignmentInfo] = {}
+        return [cls.from_dict(submission, assignments) for submission in data]
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
     @property
     def pretty_users(self) -> str:
-        return ", ".join([student.login for student in self.students])
\ No newline at end of file
+        return ", ".join([student.login for student in self.students])
@@ -0,0 +1,175 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Optional
+import logging
+import shutil
+import subprocess
+import threading
+import signal
+import os
+import time
+
+CHUNK_SIZE = 64 * 1024
+# How long the output is still read after the script was killed
+KILL_GRACE_S = 5
+
+log = logging.getLogger("grader")
+
+
+class TailBuffer:
+    """Keeps only the last `limit` bytes written to it (everything when `limit` is None)."""
+    def __init__(self, limit: Optional[int] = None) -> None:
+        self.limit = limit
+        self.total = 0
+        self.__buffer = bytearray()
+
+    def write(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        self.__buffer += chunk
+        if self.limit is not None and len(self.__buffer) > self.limit:
+            del self.__buffer[:len(self.__buffer) - self.limit]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self.__buffer)
+
+    def text(self) -> str:
+        # The cut may fall in the middle of a multi-byte character
+        return self.__buffer.decode("utf-8", errors="replace")
+
+
+@dataclass
+class CapturedProcess:
+    returncode: int
+    stdout: str
+    stderr: str
+    stdout_truncated: bool = False
+    stderr_truncated: bool = False
+    stdout_log: Optional[str] = None
+    stderr_log: Optional[str] = None
+    timed_out: bool = False
+
+
+def _kill_session(process: subprocess.Popen) -> None:
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _pump(stream: IO[bytes], tail: TailBuffer, log_path: Optional[Path]) -> None:
+    log_file = open(log_path, "wb") if log_path else None
+    try:
+        while chunk := stream.read1(CHUNK_SIZE):
+            tail.write(chunk)
+            if log_file:
+                log_file.write(chunk)
+    finally:
+        stream.close()
+        if log_file:
+            log_file.close()
+
+
+def dedicated_cores(count: int) -> list[int]:
+    # The last allowed cores, core 0 usually also serves interrupts and system daemons.
+    # Always the same ids for the same allocation, so timings stay comparable across runs
+    return sorted(os.sched_getaffinity(0))[-count:]
+
+
+def limited_command(args: list, mem_limit_mb: Optional[int] = None, cpu_time_limit_s: Optional[int] = None, cpus: Optional[list[int]] = None, max_processes: Optional[int] = None) -> list:
+    """
+    Prefixes `args` with util-linux's prlimit and taskset to apply the given rlimits
+    and CPU affinity. They are set by the time the script starts, and they are
+    inherited by every process it starts. A preexec_fn would do the same, but it
+    can deadlock the child because the grader always has other threads running,
+    so a limit whose tool is not installed is dropped with a warning instead.
+    """
+    command = [str(arg) for arg in args]
+    if cpus and not shutil.which("taskset"):
+        log.warning("taskset is not installed, the test script is not pinned to cores %s", cpus)
+    elif cpus:
+        command = ["taskset", "--cpu-list", ",".join(str(cpu) for cpu in cpus), *command]
+
+    limits = []
+    if mem_limit_mb:
+        limits.append(f"--as={mem_limit_mb * 1024 * 1024}")
+    if cpu_time_limit_s:
+        limits.append(f"--cpu={cpu_time_limit_s}")
+    if max_processes:
+        # RLIMIT_NPROC counts every process of the user, not only the script's
+        limits.append(f"--nproc={max_processes}")
+    if limits and not shutil.which("prlimit"):
+        log.warning("prlimit is not installed, the test script runs without the limits %s", " ".join(limits))
+    elif limits:
+        command = ["prlimit", *limits, "--", *command]
+    return command
+
+
+def run_captured(
+    args: list,
+    cwd: Path,
+    log_prefix: Optional[Path] = None,
+    stdout_limit: Optional[int] = None,
+    stderr_limit: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> CapturedProcess:
+    """
+    Runs `args` streaming its output instead of buffering all of it. When
+    `log_prefix` is given the complete stdout/stderr are spilled to
+    `<log_prefix>.stdout.log`/`<log_prefix>.stderr.log`, while only the last
+    `stdout_limit`/`stderr_limit` bytes are kept in memory.
+
+    The process runs in its own session: after `timeout` seconds its whole
+    process group is killed and the result is flagged as timed out, also when
+    the script itself exited but left children holding its output open.
+    """
+    stdout_log = stderr_log = None
+    if log_prefix:
+        log_prefix.parent.mkdir(parents=True, exist_ok=True)
+        stdout_log = log_prefix.with_name(log_prefix.name + ".stdout.log")
+        stderr_log = log_prefix.with_name(log_prefix.name + ".stderr.log")
+
+    stdout, stderr = TailBuffer(stdout_limit), TailBuffer(stderr_limit)
+
+    try:
+        process = subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    except OSError as e:
+        # e.g. a missing interpreter, only this submission fails
+        return CapturedProcess(returncode=-1, stdout="", stderr=f"Failed to start the grading script: {e}")
+    pumps = [
+        threading.Thread(target=_pump, args=(process.stdout, stdout, stdout_log), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, stderr, stderr_log), daemon=True),
+    ]
+    for pump in pumps:
+        pump.start()
+
+    # One deadline for the script and its output: a background child that keeps
+    # the pipes open must not outlive the timeout either
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    timed_out = False
+    try:
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        _kill_session(process)
+        returncode = process.wait()
+
+    for pump in pumps:
+        pump.join(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+    if any(pump.is_alive() for pump in pumps):
+        timed_out = True
+        _kill_session(process)
+    for pump in pumps:
+        # Descendants that escaped the process group may still hold the pipes open
+        pump.join(timeout=KILL_GRACE_S)
+
+    return CapturedProcess(
+        returncode=returncode,
+        stdout=stdout.text(),
+        stderr=stderr.text(),
+        stdout_truncated=stdout.truncated,
+        stderr_truncated=stderr.truncated,
+        stdout_log=str(stdout_log) if stdout_log else None,
+        stderr_log=str(stderr_log) if stderr_log else None,
+        timed_out=timed_out,
+    )
@@ -0,0 +1,207 @@
+from config import DaemonConfig
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import Logger
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs
+from .grader import Grader
+from telemetry import telemetry
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+
+
+class PushDebouncer:
+    """
+    Collects the repositories that were pushed to and releases each of them once
+    it received no push for `debounce_s`, so a burst of pushes is graded once.
+    A repository that keeps receiving pushes is released after `max_debounce_s`.
+    """
+    def __init__(self, debounce_s: float, max_debounce_s: float) -> None:
+        self.debounce_s = debounce_s
+        self.max_debounce_s = max_debounce_s
+        self.__condition = threading.Condition()
+        self.__first_push: dict[str, float] = {}
+        self.__last_push: dict[str, float] = {}
+        self.__closed = False
+
+    def push(self, repository: str) -> None:
+        now = time.monotonic()
+        with self.__condition:
+            self.__first_push.setdefault(repository, now)
+            self.__last_push[repository] = now
+            self.__condition.notify_all()
+
+    def __due_at(self, repository: str) -> float:
+        return min(self.__last_push[repository] + self.debounce_s, self.__first_push[repository] + self.max_debounce_s)
+
+    def wait(self, timeout: float) -> set[str]:
+        """Blocks for up to `timeout` seconds until some repositories are due and returns them."""
+        deadline = time.monotonic() + timeout
+        with self.__condition:
+            while not self.__closed:
+                now = time.monotonic()
+                due = {repository for repository in self.__last_push if self.__due_at(repository) <= now}
+                if due:
+                    for repository in due:
+                        del self.__first_push[repository], self.__last_push[repository]
+                    return due
+
+                wake_at = min([deadline] + [self.__due_at(repository) for repository in self.__last_push])
+                if wake_at <= now:
+                    break
+                self.__condition.wait(wake_at - now)
+        return set()
+
+    def close(self) -> None:
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+
+class WebhookServer:
+    """
+    Receives GitHub push webhooks on `path` and hands the full name of the pushed
+    repository to `on_push`. Only pushes to the default branch are forwarded, it
+    is the only branch the grader checks out. When `secret` is set, deliveries
+    must carry a matching X-Hub-Signature-256 header.
+    """
+    def __init__(self, host: str, port: int, path: str, secret: Optional[str], on_push: Callable[[str], None], logger: Optional[Logger] = None) -> None:
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret = secret
+        self.on_push = on_push
+        self.log = logger or logging.getLogger("grader")
+        self.__server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    @staticmethod
+    def _respond(handler: BaseHTTPRequestHandler, status: int) -> None:
+        handler.send_response(status)
+        handler.send_header("Content-Length", "0")
+        handler.end_headers()
+
+    def __verify(self, body: bytes, signature: Optional[str]) -> bool:
+        if not self.secret:
+            return True
+        expected = "sha256=" + hmac.new(self.secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        return signature is not None and hmac.compare_digest(expected, signature)
+
+    @staticmethod
+    def __parse(body: bytes, content_type: str) -> dict:
+        # GitHub delivers either JSON or a form with the JSON in its `payload` field
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            body = parse_qs(body.decode("utf-8")).get("payload", [""])[0].encode("utf-8")
+        return json.loads(body)
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        body = handler.rfile.read(int(handler.headers.get("Content-Length", 0)))
+        if handler.path.split("?")[0] != self.path:
+            return self._respond(handler, 404)
+        if not self.__verify(body, handler.headers.get("X-Hub-Signature-256")):
+            self.log.warning("Rejected a webhook delivery with an invalid signature from %s", handler.client_address[0])
+            return self._respond(handler, 401)
+
+        event = handler.headers.get("X-GitHub-Event", "")
+        telemetry.count("daemon.webhooks")
+        if event != "push":
+            # Includes the ping sent when the webhook is created
+            return self._respond(handler, 204)
+
+        try:
+            payload = self.__parse(body, handler.headers.get("Content-Type", ""))
+            repository = payload["repository"]
+            full_name = repository["full_name"]
+        except (ValueError, KeyError, TypeError):
+            return self._respond(handler, 400)
+
+        if payload.get("deleted") or payload.get("ref") != f"refs/heads/{repository.get('default_branch')}":
+            return self._respond(handler, 204)
+
+        self.log.info("Received a push to %s (%s)", full_name, payload.get("after"))
+        self.on_push(full_name)
+        self._respond(handler, 202)
+
+    def start(self) -> "WebhookServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                server._handle(self)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self.__server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.__server.daemon_threads = True
+        threading.Thread(target=self.__server.serve_forever, name="webhook", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self.__server:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+
+class GraderDaemon:
+    """
+    Keeps a grader alive between runs, along with its GitHub session, assignment
+    index, response cache and runner. Repositories are graded shortly after a push
+    webhook for them arrives, and every repository is polled at startup and every
+    `poll_interval_s` in case a delivery was missed.
+
+        daemon = GraderDaemon(Grader(config, token, logger), config.grader.daemon, logger)
+        daemon.run()
+    """
+    def __init__(self, grader: Grader, config: DaemonConfig, logger: Optional[Logger] = None) -> None:
+        self.grader = grader
+        self.config = config
+        self.log = logger or logging.getLogger("grader")
+        self.pushes = PushDebouncer(config.debounce_s, config.max_debounce_s)
+        self.server = WebhookServer(config.host, config.port, config.webhook_path, config.webhook_secret, self.pushes.push, self.log)
+        self.__stopped = threading.Event()
+
+    def __grade(self, repositories: Optional[set[str]]) -> None:
+        try:
+            self.grader.grade(repositories)
+        except Exception:
+            # The daemon outlives a failed run, the next poll grades whatever it missed
+            self.log.exception("Grading run failed")
+
+    def run(self) -> None:
+        if not self.config.webhook_secret:
+            self.log.warning("No webhook secret configured, webhook deliveries are not authenticated")
+
+        self.server.start()
+        self.log.info("Listening for push webhooks on %s", self.server.url)
+
+        # Poll right away, pushes may have been missed while the daemon was down
+        next_poll = time.monotonic()
+        try:
+            while not self.__stopped.is_set():
+                repositories = self.pushes.wait(max(next_poll - time.monotonic(), 0))
+                if self.__stopped.is_set():
+                    break
+
+                if repositories:
+                    self.log.info("Grading %d pushed repositories: %s", len(repositories), ", ".join(sorted(repositories)))
+                    self.__grade(repositories)
+                elif time.monotonic() >= next_poll:
+                    self.log.info("Polling every repository for new commits")
+                    self.__grade(None)
+                    next_poll = time.monotonic() + self.config.poll_interval_s
+        finally:
+            self.server.stop()
+            self.log.info("Daemon stopped")
+
+    def stop(self) -> None:
+        self.__stopped.set()
+        self.pushes.close()
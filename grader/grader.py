@@ -1,8 +1,8 @@
-from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 import json
-from typing import Any, Iterable
+from typing import Any, Iterable, Optional
 from config import ProgramConfig, AssignmentConfig, AssignmentTaskConfig
-from git import Repo, Git
+from git import Git
 from gh import GithubClassroomAPI
 from gh.filters import By
 from gh.exceptions import GitHubException
@@ -10,30 +10,66 @@ from gh.structs import SubmissionInfo
 from .exceptions import GraderException
 from pathlib import Path
 from os import mkdir
-from shutil import rmtree
+from functools import partial
 from logging import Logger
 from runners import *
 from shutil import copyfile
-import subprocess
-from .structs import GradeResult
+from .repos import RepositoryStore
+from .sharding import WorkQueue, static_shard
+from .scheduler import TaskScheduler
+from .state import StateStore, PENDING, RUNNING, GRADED, CHECKOUT_FAILED
+from .results import ResultsLog
+from .capture import CapturedProcess, dedicated_cores, limited_command, run_captured
+from .pipeline import BackgroundCleaner, PrefetchPipeline, directory_size
+from .stats import RuntimeStats, summarize, summarize_trials
 from logger import build_logger
+from telemetry import telemetry
 import os
+import threading
+import time
+
+def _valid_runtimes(times: Any) -> bool:
+    return isinstance(times, list) and bool(times) and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in times)
+
 
 class Grader:
     def __init__(self, config: ProgramConfig, pat: str, logger: Logger) -> None:
         self.config = config
         self.pat = pat
-        self.classroom = GithubClassroomAPI(pat)
         self.wd = Path(config.grader.working_dir)
+        self.classroom = GithubClassroomAPI(pat, cache_dir=str(self.wd / ".cache"), index_ttl=config.grader.assignment_index_ttl_s, http_cache=config.grader.http_cache, base_url=config.grader.github_api_url)
         self.git = Git(self.wd / ".git")
+        self.repos = RepositoryStore(self.wd / ".repos", pat)
         self.log = logger
-        self.job_ids: list[tuple] = []
         self.runner: ABRunner = self._get_runner()
-        self.previous_grades: dict = {}
+        # Per-run cache of repository.html_url -> HEAD commit, shared by every task and assignment.
+        # Assignments are fetched concurrently: they share one probe pool, and a repository being
+        # probed for one of them is awaited by the others instead of being probed twice
+        self.commit_hashes: dict[str, Optional[str]] = {}
+        self.probes: dict[str, Future] = {}
+        self.probe_lock = threading.Lock()
+        self.probe_pool = ThreadPoolExecutor(max_workers=config.grader.probe_concurrency, thread_name_prefix="probe")
 
         if not (self.wd / ".cache").exists():
             mkdir(self.wd / ".cache")
 
+        self.state = StateStore(self.wd / ".cache" / "grading_state.db")
+        self.results = ResultsLog(self.wd / "results.jsonl")
+
+        # Grading jobs flush their spans here, the grader merges them once the run is over
+        telemetry.enabled = config.grader.telemetry
+        self.telemetry_dir = self.wd / ".telemetry" / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+    def __getstate__(self) -> dict:
+        # The grader is pickled along with _grade_task, grading jobs never need the runner
+        state = self.__dict__.copy()
+        state.pop("runner", None)
+        for name in ("probes", "probe_lock", "probe_pool"):
+            state.pop(name, None)
+        with self.probe_lock:
+            state["commit_hashes"] = dict(self.commit_hashes)
+        return state
+
     def _get_assignment(self, assignment_cfg: AssignmentConfig):
         if assignment_cfg.invite_link:
             assignment = self.classroom.get_assignment_by(By.INVITE_LINK, assignment_cfg.invite_link)
@@ -46,107 +82,321 @@ class Grader:
         
         return assignment
 
-    def _grade_assignment(self, assignment_cfg: AssignmentConfig) -> None:
-        assignment = self._get_assignment(assignment_cfg)
-        submissions = self.classroom.get_submissions_for_assignment(assignment.id)
-
-        for task in assignment_cfg.tasks:
-            blocking = task.blocking
-
-            if task.skip:
-                self.log.info("Skipping grading for task: %s[%s]", assignment_cfg.name, task.name)
-                self.job_ids.append((assignment_cfg, task, None))
-                continue
-            
-            self.log.info("Launching grading job for task: %s[%s]", assignment_cfg.name, task.name)
-            job_id = self.runner.run(self._grade_task, task, submissions)
-            self.job_ids.append((assignment_cfg, task, job_id))
-
-            if blocking:
-                self.log.info("Waiting for blocking task %s[%s] to complete", assignment_cfg.name, task.name)
-                self.runner.wait(job_id)
+    def _fetch_submissions(self, assignment_cfg: AssignmentConfig, repositories: Optional[set[str]] = None) -> list[SubmissionInfo]:
+        with telemetry.span("github.assignment", assignment=assignment_cfg.name):
+            assignment = self._get_assignment(assignment_cfg)
+        with telemetry.span("github.submissions", assignment=assignment_cfg.name):
+            submissions = self.classroom.get_submissions_for_assignment(assignment.id)
+        submissions = [submission for submission in submissions if submission.commit_count > 0]
+        if repositories is not None:
+            submissions = [submission for submission in submissions if submission.repository.full_name in repositories]
+
+        self._resolve_commit_hashes(submissions)
+        return submissions
+
+    def _submit_task(self, assignment_cfg: AssignmentConfig, task: AssignmentTaskConfig, submissions: Future) -> Optional[int]:
+        if task.skip:
+            self.log.info("Skipping grading for task: %s[%s]", assignment_cfg.name, task.name)
+            return None
+
+        updated_submissions = self._filter_updated_submissions(assignment_cfg, task, submissions.result())
+        if not updated_submissions:
+            self.log.info("No updated submissions for task: %s[%s]", assignment_cfg.name, task.name)
+            return None
+
+        self.log.info("Launching grading job for task: %s[%s]", assignment_cfg.name, task.name)
+        if task.distribution == "dynamic":
+            WorkQueue.create(self._work_queue_path(assignment_cfg, task))
+        with telemetry.span("runner.submit", task=task.name, submissions=len(updated_submissions)):
+            job_id = self.runner.run(self._grade_task, task, updated_submissions, assignment_cfg, submitted_at=time.time())
+
+        # Written here rather than by the grading job, only the grader process opens the state store
+        self.state.mark(
+            assignment_cfg.name,
+            task.name,
+            [(submission.repository.html_url, self.commit_hashes[submission.repository.html_url]) for submission in updated_submissions],
+            RUNNING,
+        )
+        return job_id
+
+    def _schedule_assignments(self, repositories: Optional[set[str]] = None) -> None:
+        # Assignments are fetched concurrently, each task is submitted as soon as its
+        # submissions are known and the tasks it depends on are complete, and its
+        # results are collected as soon as its job is done
+        scheduler = TaskScheduler(self.runner, poll_interval=self.config.grader.scheduler_poll_s, logger=self.log)
+
+        with ThreadPoolExecutor(max_workers=max(len(self.config.assignments), 1), thread_name_prefix="assignment") as pool:
+            for assignment_cfg in self.config.assignments:
+                self.log.info("Fetching submissions for assignment: %s", assignment_cfg.name)
+                submissions = pool.submit(self._fetch_submissions, assignment_cfg, repositories)
+
+                for task in assignment_cfg.tasks:
+                    scheduler.add(
+                        (assignment_cfg.name, task.name),
+                        [(assignment_cfg.name, dependency) for dependency in assignment_cfg.task_dependencies(task)],
+                        (lambda: True) if task.skip else submissions.done,
+                        partial(self._submit_task, assignment_cfg, task, submissions),
+                        partial(self._collect_task, assignment_cfg, task),
+                    )
+
+            with telemetry.span("schedule"):
+                scheduler.run()
 
     def _get_latest_commit_hash(self, submission: SubmissionInfo) -> str:
+        try:
+            # The REST API goes through the pooled session instead of spawning a git process
+            return self.classroom.get_latest_commit_hash(submission.repository.full_name, submission.repository.default_branch)
+        except GitHubException as e:
+            self.log.debug("Falling back to ls-remote for %s: %s", submission.repository.full_name, e.message)
+
         repo_url = submission.repository.html_url.replace("https://", f"https://{self.pat}@")
-        commit_hash = self.git.ls_remote(repo_url, "HEAD").split()[0]
+        telemetry.count("probe.ls_remote")
+        with telemetry.span("probe.ls_remote", repo=submission.repository.full_name):
+            commit_hash = self.git.ls_remote(repo_url, "HEAD").split()[0]
         return commit_hash
+
+    def _try_get_latest_commit_hash(self, submission: SubmissionInfo) -> Optional[str]:
+        try:
+            return self._get_latest_commit_hash(submission)
+        except Exception as e:
+            # One bad repository must not abort the others. Don't log the exception itself, the remote URL embeds the PAT
+            self.log.error("Failed to resolve HEAD for %s (%s), skipping it", submission.repository.full_name, type(e).__name__)
+            return None
+
+    def _resolve_commit_hashes(self, submissions: list[SubmissionInfo]) -> None:
+        # Probing is network bound, every repository is resolved concurrently on the shared pool
+        pending: dict[str, Future] = {}
+        started = 0
+        with self.probe_lock:
+            for submission in submissions:
+                url = submission.repository.html_url
+                if url in self.commit_hashes or url in pending:
+                    continue
+                if url not in self.probes:
+                    self.probes[url] = self.probe_pool.submit(self._try_get_latest_commit_hash, submission)
+                    started += 1
+                pending[url] = self.probes[url]
+        if not pending:
+            return
+
+        self.log.info("Resolving latest commit for %d repositories", started)
+        with telemetry.span("probe.commits", repositories=started):
+            for url, probe in pending.items():
+                commit_hash = None
+                try:
+                    commit_hash = probe.result()
+                finally:
+                    # Never keep a failed probe around, the daemon would re-raise it on every run
+                    with self.probe_lock:
+                        self.commit_hashes[url] = commit_hash
+                        self.probes.pop(url, None)
     
-    def _open_cache_file(self, task: AssignmentTaskConfig) -> dict[str, Any]:
-        cache_file_path = self.wd / ".cache" / f"{task.name}_cache.json"
-        if not cache_file_path.exists():
-            with open(cache_file_path, 'w') as cache_file:
-                json.dump({"perf_hash": task.performance_hash(), "cache": {}}, cache_file)
-        
-        with open(cache_file_path, 'r') as cache_file:
+    def _import_legacy_cache(self, assignment_cfg: AssignmentConfig, task: AssignmentTaskConfig, perf_hash: str) -> None:
+        # Seed the state store from the per-task JSON caches used before it existed
+        legacy_cache_path = self.wd / ".cache" / f"{task.name}_cache.json"
+        if not legacy_cache_path.exists() or self.state.perf_hashes(assignment_cfg.name, task.name):
+            return
+
+        with open(legacy_cache_path, 'r') as cache_file:
             cache: dict[str, Any] = json.load(cache_file)
-        
-        return cache
-    
-    def _save_cache_file(self, task: AssignmentTaskConfig, cache: dict[str, Any]) -> None:
-        cache_file_path = self.wd / ".cache" / f"{task.name}_cache.json"
-        with open(cache_file_path, 'w') as cache_file:
-            json.dump(cache, cache_file, indent=4)
 
-    def _filter_updated_submissions(self, task: AssignmentTaskConfig, submissions: Iterable[SubmissionInfo]) -> list[SubmissionInfo]:
-        cache = self._open_cache_file(task)
-        updated_submissions = []
+        if cache.get("perf_hash") in (perf_hash, task.legacy_performance_hash()):
+            self.log.info("Importing legacy cache %s for %s[%s]", legacy_cache_path.name, assignment_cfg.name, task.name)
+            self.state.mark(assignment_cfg.name, task.name, cache.get("cache", {}).items(), GRADED, perf_hash)
 
-        if cache.get("perf_hash") != task.performance_hash():
+    def _filter_updated_submissions(self, assignment_cfg: AssignmentConfig, task: AssignmentTaskConfig, submissions: Iterable[SubmissionInfo]) -> list[SubmissionInfo]:
+        perf_hash = task.performance_hash()
+        submissions = list(submissions)
+
+        self._import_legacy_cache(assignment_cfg, task, perf_hash)
+        completed = self.state.completed(assignment_cfg.name, task.name, perf_hash, task.max_noisy_runs if task.max_cv is not None else None)
+
+        if not completed and self.state.perf_hashes(assignment_cfg.name, task.name) - {perf_hash}:
             self.log.info("Task configuration changed for %s, regrading all submissions.", task.name)
-            cache["perf_hash"] = task.performance_hash()
-            cache["cache"] = {}
-    
+
+        self._resolve_commit_hashes(submissions)
+
+        updated_submissions = []
         for submission in submissions:
-            commit_hash = self._get_latest_commit_hash(submission)
-            if cache["cache"].get(submission.repository.html_url) != commit_hash:
+            commit_hash = self.commit_hashes[submission.repository.html_url]
+            if commit_hash is None:
+                continue
+            if (submission.repository.html_url, commit_hash) not in completed:
                 updated_submissions.append(submission)
-            cache["cache"][submission.repository.html_url] = commit_hash
 
-        # TODO: Fix possible logic bug in which updated submissions are not graded (grader crashes) but the cache is updated anyway
-        self._save_cache_file(task, cache)
+        # Submissions only become graded once their results are collected, if the grader
+        # crashes in between they stay pending and are graded again on the next run
+        self.state.mark(
+            assignment_cfg.name,
+            task.name,
+            [(submission.repository.html_url, self.commit_hashes[submission.repository.html_url]) for submission in updated_submissions],
+            PENDING,
+            perf_hash,
+        )
 
         return updated_submissions
 
-    def _grade_task(self, task: AssignmentTaskConfig, submissions: Iterable[SubmissionInfo]) -> list[dict]:
-        task_id = int(os.environ.get('SLURM_PROCID', 0))
-        data = []
+    def _work_queue_path(self, assignment_cfg: AssignmentConfig, task: AssignmentTaskConfig) -> Path:
+        return self.wd / ".queues" / f"{assignment_cfg.name}_{task.name}"
 
-        if task_id != 0:
-            return []
+    def _assigned_submissions(self, task: AssignmentTaskConfig, submissions: list[SubmissionInfo], assignment_cfg: AssignmentConfig, rank: int, world_size: int) -> Iterable[SubmissionInfo]:
+        if task.distribution == "static":
+            return static_shard(submissions, rank, world_size)
+        if task.distribution == "dynamic":
+            return WorkQueue(self._work_queue_path(assignment_cfg, task)).iterate(submissions)
+        return submissions if rank == 0 else []
 
-        logger = build_logger(name=f"grader.task.{task.name}", level=self.log.level)
+    def _grade_task(self, task: AssignmentTaskConfig, submissions: list[SubmissionInfo], assignment_cfg: AssignmentConfig, submitted_at: Optional[float] = None) -> list[dict]:
+        rank = int(os.environ.get('SLURM_PROCID', 0))
 
-        submissions = filter(lambda x: x.commit_count > 0, submissions)
+        # Grading jobs run in their own process, possibly on another node
+        telemetry.enabled = self.config.grader.telemetry
+        if submitted_at is not None:
+            telemetry.record("runner.queue_wait", submitted_at, time.time(), task=task.name)
 
-        for submission in self._filter_updated_submissions(task, submissions):
-            res = self._grade_submission(submission, task, logger)
-            data.append(res)
+        try:
+            with telemetry.span("grade_task", task=task.name, rank=rank):
+                return self._grade_assigned(task, submissions, assignment_cfg, rank)
+        finally:
+            telemetry.flush(self.telemetry_dir, f"{assignment_cfg.name}[{task.name}] rank {rank}")
+
+    def _grade_assigned(self, task: AssignmentTaskConfig, submissions: list[SubmissionInfo], assignment_cfg: AssignmentConfig, rank: int) -> list[dict]:
+        world_size = int(os.environ.get('SLURM_NTASKS', 1))
+        data = []
+
+        logger = build_logger(name=f"grader.task.{task.name}.{rank}", level=self.log.level)
+
+        if task.benchmark.trials > 1 and task.benchmark.interleave:
+            if task.distribution == "dynamic":
+                # Interleaving needs every submission up front, a shared queue would hand them all to the first rank
+                assigned = static_shard(submissions, rank, world_size)
+            else:
+                assigned = self._assigned_submissions(task, submissions, assignment_cfg, rank, world_size)
+            return self._benchmark_interleaved(task, list(assigned), assignment_cfg, logger)
+
+        # Upcoming submissions are checked out while the test script runs on the current one,
+        # unless it is being benchmarked: the checkout would compete with it for the (pinned) cores
+        budget_mb = self.config.grader.prefetch_disk_budget_mb
+        pipeline = PrefetchPipeline(
+            self._assigned_submissions(task, submissions, assignment_cfg, rank, world_size),
+            partial(self._checkout_submission, task=task, assignment_cfg=assignment_cfg, log=logger),
+            depth=0 if task.benchmarking() else self.config.grader.prefetch_depth,
+            disk_budget_bytes=budget_mb * 1024 * 1024 if budget_mb else None,
+            size=(lambda checkout: directory_size(checkout[1])) if budget_mb else None,
+        )
+        cleaner = BackgroundCleaner()
+
+        try:
+            for prefetched in pipeline:
+                if prefetched.error is not None:
+                    # A repository that can't be checked out fails on its own, the others are still graded
+                    repo_dir = self._repo_dir(prefetched.item, task)
+                    data.append(self._checkout_failed(task, prefetched.item, repo_dir, prefetched.error, logger))
+                else:
+                    commit_hash, repo_dir = prefetched.value
+                    data.append(self._grade_submission(prefetched.item, task, assignment_cfg, commit_hash, repo_dir, logger))
+
+                if assignment_cfg.preserve_repo_files:
+                    pipeline.release(prefetched)
+                else:
+                    cleaner.remove(repo_dir, callback=partial(pipeline.release, prefetched))
+                    if task.benchmarking():
+                        # Don't time the next submission while this one is being deleted
+                        cleaner.wait()
+        finally:
+            cleaner.close()
 
         return data
-           
-    def _grade_submission(self, submission: SubmissionInfo, task: AssignmentTaskConfig, log: Logger) -> dict:
-        log.info("Grading submission for %s[%s]", submission.repository.full_name, task.name)
-        repo_dir = self.wd / (submission.repository.full_name.replace('/', '_') + f"_{task.name}")
-        
-        if repo_dir.exists():
-            log.info("Cleaning up existing repository directory %s", repo_dir)
-            rmtree(repo_dir)
 
-        repo_url = submission.repository.html_url.replace("https://", f"https://{self.pat}@")
-        log.debug("Downloading %s", repo_url)
-        repo = Repo.clone_from(repo_url, repo_dir)
+    def _repo_dir(self, submission: SubmissionInfo, task: AssignmentTaskConfig) -> Path:
+        return self.wd / (submission.repository.full_name.replace('/', '_') + f"_{task.name}")
+
+    def _checkout_submission(self, submission: SubmissionInfo, task: AssignmentTaskConfig, assignment_cfg: AssignmentConfig, log: Logger) -> tuple[str, Path]:
+        repo_dir = self._repo_dir(submission, task)
+
+        log.debug("Fetching %s", submission.repository.full_name)
+        with telemetry.span("checkout", repo=submission.repository.full_name):
+            commit_hash = self.repos.checkout(submission, self.commit_hashes.get(submission.repository.html_url), repo_dir, assignment_cfg.clone)
+        log.debug("Checked out %s at commit %s", submission.repository.full_name, commit_hash)
 
-        commit_hash = repo.head.commit.hexsha
-        log.debug("Cloned repository at commit %s", commit_hash)
+        return commit_hash, repo_dir
 
-        result = self._grade_task_submission(task, submission, commit_hash, repo_dir)
+    def _checkout_failed(self, task: AssignmentTaskConfig, submission: SubmissionInfo, repo_dir: Path, error: Exception, log: Logger) -> dict:
+        # Git errors quote the clone URL, which carries the token
+        message = str(error).replace(self.pat, "***") if self.pat else str(error)
+        log.error("Failed to check out %s[%s]: %s", submission.repository.full_name, task.name, message)
+        telemetry.count("submissions.checkout_failed")
+        commit_hash = self.commit_hashes.get(submission.repository.html_url)
+        return self._result_dict(submission, commit_hash, repo_dir, CHECKOUT_FAILED, f"Failed to check out the repository: {message}", "", [], None, None, CapturedProcess(-1, "", ""))
+
+    def _grade_submission(self, submission: SubmissionInfo, task: AssignmentTaskConfig, assignment_cfg: AssignmentConfig, commit_hash: str, repo_dir: Path, log: Logger) -> dict:
+        log.info("Grading submission for %s[%s]", submission.repository.full_name, task.name)
+
+        result = self._grade_task_submission(task, submission, commit_hash, repo_dir, assignment_cfg)
             
         return result
-    
-    def _grade_task_submission(self, task: AssignmentTaskConfig, submission: SubmissionInfo, commit_hash: str, repo_dir: Path) -> dict:
-        # Use slurm to run the grading script
-        # Copy the grading script to the repo directory
 
+    def _benchmark_interleaved(self, task: AssignmentTaskConfig, submissions: list[SubmissionInfo], assignment_cfg: AssignmentConfig, log: Logger) -> list[dict]:
+        # Every submission is checked out before the first trial, trials then take turns across
+        # submissions so that a slow drift of the node is spread over all of them
+        checkouts = []
+        failed = []
+        try:
+            for submission in submissions:
+                try:
+                    commit_hash, repo_dir = self._checkout_submission(submission, task, assignment_cfg, log)
+                except Exception as e:
+                    failed.append(self._checkout_failed(task, submission, self._repo_dir(submission, task), e, log))
+                    continue
+                checkouts.append((submission, commit_hash, repo_dir, self._install_grading_script(task, repo_dir)))
+
+            outcomes: list[list[tuple]] = [[] for _ in checkouts]
+            for trial in range(task.benchmark.trials):
+                # Rotate the order every trial, no submission always runs first
+                shift = trial % len(checkouts) if checkouts else 0
+                for idx in list(range(shift, len(checkouts))) + list(range(shift)):
+                    submission, _, repo_dir, grading_script = checkouts[idx]
+                    if outcomes[idx] and outcomes[idx][-1][0][0] != "graded":
+                        continue
+
+                    log.info("Benchmark trial %d/%d for %s[%s]", trial + 1, task.benchmark.trials, submission.repository.full_name, task.name)
+                    outcomes[idx].append(self._run_trial(task, submission, grading_script, repo_dir, assignment_cfg))
+
+            return failed + [
+                self._benchmark_result(task, submission, commit_hash, repo_dir, outcomes[idx])
+                for idx, (submission, commit_hash, repo_dir, _) in enumerate(checkouts)
+            ]
+        finally:
+            if not assignment_cfg.preserve_repo_files:
+                cleaner = BackgroundCleaner()
+                for repo_dir in [repo_dir for _, _, repo_dir, _ in checkouts] + [Path(result["repo_dir"]) for result in failed]:
+                    cleaner.remove(repo_dir)
+                cleaner.close()
+
+    def _run_grading_script(self, task: AssignmentTaskConfig, submission: SubmissionInfo, grading_script: Path, repo_dir: Path, assignment_cfg: AssignmentConfig) -> CapturedProcess:
+        cpus = dedicated_cores(task.benchmark.pin_cores) if task.benchmark.pin_cores else None
+        mem_limits = [task.mem_limit_mb]
+        if self.config.grader.runner == "local" and task.local_backend.mem_gb:
+            mem_limits.append(int(task.local_backend.mem_gb * 1024))
+        mem_limit_mb = min((limit for limit in mem_limits if limit), default=None)
+
+        command = limited_command([grading_script], mem_limit_mb, task.cpu_time_limit_s, cpus, task.max_processes)
+        if not task.stream_output:
+            return run_captured(command, cwd=repo_dir, timeout=task.timeout_s)
+
+        # Spill the whole output to disk, keep only its tail in memory
+        log_prefix = self.wd / "logs" / assignment_cfg.name / task.name / submission.repository.full_name.replace('/', '_')
+        return run_captured(
+            command,
+            cwd=repo_dir,
+            log_prefix=log_prefix,
+            stdout_limit=task.stdout_limit_bytes,
+            stderr_limit=task.stderr_limit_bytes,
+            timeout=task.timeout_s,
+        )
+
+    def _install_grading_script(self, task: AssignmentTaskConfig, repo_dir: Path) -> Path:
+        # Copy the grading script to the repo directory
         grading_script_dest = repo_dir / Path(task.test_script_path).name
         copyfile(task.test_script_path, grading_script_dest)
 
@@ -154,18 +404,84 @@ class Grader:
         grading_script_dest.chmod(0o755)
 
         self.log.debug("Copied grading script to %s", grading_script_dest)
+        return grading_script_dest
+
+    def _run_trial(self, task: AssignmentTaskConfig, submission: SubmissionInfo, grading_script: Path, repo_dir: Path, assignment_cfg: AssignmentConfig) -> tuple[tuple, CapturedProcess]:
+        with telemetry.span("script", repo=submission.repository.full_name, task=task.name):
+            result = self._run_grading_script(task, submission, grading_script, repo_dir, assignment_cfg)
+        return self._parse_grading_output(task, submission, result), result
+
+    def _benchmark_result(self, task: AssignmentTaskConfig, submission: SubmissionInfo, commit_hash: str, repo_dir: Path, outcomes: list[tuple[tuple, CapturedProcess]]) -> dict:
+        parsed = [outcome for outcome, _ in outcomes]
+        # A failed trial fails the submission, otherwise the last trial provides the reported data
+        status, error, stdout, data, _ = next((outcome for outcome in parsed if outcome[0] != "graded"), parsed[-1])
+        trials = [runtimes for outcome_status, _, _, _, runtimes in parsed if outcome_status == "graded"]
+
+        stats = summarize_trials(trials, task.warmup_runs)
+        if status == "graded" and stats is not None and stats.is_noisy(task.max_cv):
+            status = "noisy"
+        if stats is not None:
+            self.log.info("Median runtime for %s [%s] over %d trials: %.4f ms (cv %.3f)", submission.repository.full_name, task.name, len(trials), stats.median, stats.cv)
+
+        result = self._result_dict(submission, commit_hash, repo_dir, status, error, stdout, [value for runtimes in trials for value in runtimes], stats, data, outcomes[-1][1])
+        result["trials"] = trials
+        return result
 
-        # Run inside the slurm environment, pipe stdout to a variable
-        self.log.info("Running grading script")
-        
+    def _result_dict(self, submission: SubmissionInfo, commit_hash: str, repo_dir: Path, status: str, error: str, stdout: str, runtimes: list[float], stats: Optional[RuntimeStats], data: Optional[dict], result: CapturedProcess) -> dict:
+        return {"name": submission.pretty_users, "repo": submission.repository.html_url, "repo_dir": str(repo_dir), "commit_hash": commit_hash, "status": status, "error": error, "stdout": stdout, "runtimes": runtimes, "stats": stats.to_dict() if stats else None, "data": data, "stdout_log": result.stdout_log, "stderr_log": result.stderr_log}
+
+    def _grade_task_submission(self, task: AssignmentTaskConfig, submission: SubmissionInfo, commit_hash: str, repo_dir: Path, assignment_cfg: AssignmentConfig) -> dict:
+        # Use slurm to run the grading script
+        grading_script_dest = self._install_grading_script(task, repo_dir)
+
+        if task.benchmark.trials > 1:
+            outcomes = []
+            for trial in range(task.benchmark.trials):
+                self.log.info("Benchmark trial %d/%d for %s[%s]", trial + 1, task.benchmark.trials, submission.repository.full_name, task.name)
+                outcomes.append(self._run_trial(task, submission, grading_script_dest, repo_dir, assignment_cfg))
+                if outcomes[-1][0][0] != "graded":
+                    break
+            return self._benchmark_result(task, submission, commit_hash, repo_dir, outcomes)
+
+        # Noisy runtimes are measured again right away, up to noise_reruns more times
+        attempts = 1 + (task.noise_reruns if task.max_cv is not None else 0)
+        for attempt in range(attempts):
+            # Run inside the slurm environment, pipe stdout to a variable
+            self.log.info("Running grading script")
+
+            with telemetry.span("script", repo=submission.repository.full_name, task=task.name):
+                result = self._run_grading_script(task, submission, grading_script_dest, repo_dir, assignment_cfg)
+            status, error, stdout, data, runtimes = self._parse_grading_output(task, submission, result)
+            stats = summarize(runtimes, task.warmup_runs)
+
+            if status != "graded" or stats is None or not stats.is_noisy(task.max_cv):
+                break
+            self.log.warning("Runtimes of %s[%s] are noisy (cv %.3f > %.3f), attempt %d/%d", submission.repository.full_name, task.name, stats.cv, task.max_cv, attempt + 1, attempts)
+        else:
+            # Still noisy, not a completed state: the next grader run measures it again
+            status = "noisy"
+
+        if stats is not None:
+            self.log.info("Median runtime for %s [%s]: %.4f ms (cv %.3f)", submission.repository.full_name, task.name, stats.median, stats.cv)
+
+        return self._result_dict(submission, commit_hash, repo_dir, status, error, stdout, runtimes, stats, data, result)
+
+    def _parse_grading_output(self, task: AssignmentTaskConfig, submission: SubmissionInfo, result: CapturedProcess) -> tuple[str, str, str, Optional[dict], list[float]]:
         data = None
         error = ""
         status = ""
         stdout = ""
         runtimes = []
-        
-        try:
-            result = subprocess.run([grading_script_dest], cwd=repo_dir, capture_output=True, text=True, check=True)
+
+        if result.stdout_truncated or result.stderr_truncated:
+            self.log.warning("Output of %s[%s] exceeded the capture limits, only its tail was kept", submission.repository.full_name, task.name)
+
+        if result.timed_out:
+            self.log.error("Grading script of %s[%s] timed out after %ss", submission.repository.full_name, task.name, task.timeout_s)
+            error = f"Grading script timed out after {task.timeout_s}s and was killed.\nFull stderr:\n" + result.stderr
+            stdout = result.stdout
+            status = "timeout"
+        elif result.returncode == 0:
             result.stdout = result.stdout.strip()
             stdout = result.stdout
             last_line = result.stdout.split('\n')[-1]
@@ -173,8 +489,15 @@ class Grader:
             # {'passed': 12, 'total': 12, 'times': [442.44458, 664.421387, 886.576111, 354.137085, 442.864655, 663.164917, 884.586487, 354.348022, 443.62854, 664.1828, 885.255188, 354.565033]}
             try:
                 data = json.loads(last_line)
-                runtimes = data.get("times", [])
-                status = "graded"
+                times = data.get("times") if isinstance(data, dict) else None
+                if _valid_runtimes(times):
+                    runtimes = times
+                    status = "graded"
+                else:
+                    # The runtime statistics need at least one number, don't let them crash the whole job
+                    self.log.error("Grading script of %s[%s] reported no valid times: %s", submission.repository.full_name, task.name, last_line)
+                    status = "error"
+                    error = "The grading script output has no valid \"times\" list of runtimes.\nLast line: " + last_line + "\nFull stderr:\n" + result.stderr
             except json.JSONDecodeError:
                 self.log.error("Failed to parse grading script output as JSON: %s", last_line)
                 status = "error"
@@ -182,68 +505,42 @@ class Grader:
 
             self.log.info("Grading result: %s", data)
             self.log.info("Grading script output: %s", result.stdout)
-        except subprocess.CalledProcessError as e:
-            self.log.error("Grading script failed with error: %s", e.stderr)
-            error = e.stderr
-            stdout = e.stdout
+        else:
+            self.log.error("Grading script failed with error: %s", result.stderr)
+            error = result.stderr
+            stdout = result.stdout
             status = "error"
 
-        runtime = sum(runtimes) / len(runtimes) if runtimes else 0.0
-        self.log.info("Average runtime for %s [%s]: %.4f ms", submission.repository.full_name, task.name, runtime)
-
-        return {"name": submission.pretty_users, "repo_dir": str(repo_dir), "commit_hash": commit_hash, "status": status, "error": error, "stdout": stdout, "runtimes": runtimes, "data": data}  # Placeholder grade
+        return status, error, stdout, data, runtimes
  
-    def _get_result_defaultdict(self) -> dict:
-        return defaultdict(
-            lambda: defaultdict(
-                lambda: GradeResult("", "", {}, {}, {}, {}, {})
-                )
-            )
-                
-    def _retrieve_results(self, existing_data: dict) -> dict:
-        data: dict[str, dict[str, GradeResult]] = self._get_result_defaultdict()
-        
-        repos_to_cleanup = set()
-
-        for assignment_cfg, task, jobid in self.job_ids:
-            if jobid is None:
-                self.log.info("Skipping result retrieval for skipped task: %s[%s]", assignment_cfg.name, task.name)    
-                continue
-
+    def _collect_task(self, assignment_cfg: AssignmentConfig, task: AssignmentTaskConfig, jobid: int) -> None:
+        with telemetry.span("runner.collect", task=task.name):
             task_results = self.runner.collect_results(jobid)
-            self.log.info("Collected results for %s[%s]", assignment_cfg.name, task.name)
+        self.log.info("Collected results for %s[%s]", assignment_cfg.name, task.name)
+        telemetry.count("submissions.graded", len(task_results))
 
-            for result in task_results:
-                name = result["name"]
-                data[assignment_cfg.name][name].update_from_dict(result, task.name)
-            
-                repo_dir = Path(result["repo_dir"])
-                if not assignment_cfg.preserve_repo_files:
-                    repos_to_cleanup.add(repo_dir)
-
-        result = existing_data
-
-        # compute the students to keep because they were not re-graded
-        to_add = defaultdict(list)
+        # Persist the results before marking them as graded, a crash in between only causes a regrade.
+        # A failed checkout graded nothing, the leaderboard keeps the student's last real grade
+        with telemetry.span("results.persist", task=task.name):
+            self.results.append(assignment_cfg.name, task.name, [result for result in task_results if result["status"] != CHECKOUT_FAILED])
 
-        for assignment_name, students in existing_data.items():
-            to_add[assignment_name].extend([student for student in students if student["name"] not in data[assignment_name]]) 
+            perf_hash = task.performance_hash()
+            for status in {result["status"] for result in task_results}:
+                entries = [(result["repo"], result["commit_hash"]) for result in task_results if result["status"] == status]
+                self.state.mark(assignment_cfg.name, task.name, entries, status, perf_hash)
 
-        # when updating the data, don't forget to add the non-updated students
-        for assignment_name, students in data.items():
-            result[assignment_name] = [student.to_dict() for student in students.values()] + to_add[assignment_name]
-
-        # Cleanup repositories
-        for repo_dir in repos_to_cleanup:
-            rmtree(repo_dir)
-            self.log.debug("Deleted repository files for %s", repo_dir.name.replace('_', '/'))
-        
-        return result
+        # Publish right away, the leaderboard must not wait for the slowest task of the run
+        with telemetry.span("results.materialize", task=task.name):
+            self.results.materialize(Path(self.config.grader.grades_file))
 
     def _get_runner(self) -> ABRunner:
         logs_dir = Path(self.config.grader.working_dir) / "slurm_logs"
         logs_dir.mkdir(parents=True, exist_ok=True)
-        return SlurmRunner(logs_folder=str(logs_dir))
+        if self.config.grader.runner == "local":
+            return LocalRunner(max_workers=self.config.grader.local_workers, logger=self.log)
+        if self.config.grader.runner == "slurm_array":
+            return SlurmArrayRunner(logs_folder=str(logs_dir), logger=self.log)
+        return SlurmRunner(logs_folder=str(logs_dir), logger=self.log)
 
     def _load_grades_file(self) -> dict:
         grades_file_path = Path(self.config.grader.grades_file)
@@ -252,23 +549,30 @@ class Grader:
                 return json.load(f)
         return {}
     
-    def _save_grades_file(self, data: dict) -> None:
-        grades_file_path = Path(self.config.grader.grades_file)
-        with open(grades_file_path, 'w') as f:
-            json.dump(data, f, indent=4)
+    def grade(self, repositories: Optional[set[str]] = None):
+        """Grades every submission, or only those of `repositories` (full names, e.g. "org/repo")."""
+        try:
+            with telemetry.span("grade"):
+                self._grade(repositories)
+        finally:
+            if self.config.grader.telemetry:
+                telemetry.export(self.telemetry_dir, self.wd)
+                self.log.info("Wrote run trace and metrics to %s", self.wd)
+
+    def _grade(self, repositories: Optional[set[str]] = None) -> None:
+        if not self.results.exists():
+            # First run with the results log, carry over the existing leaderboard
+            self.results.seed(self._load_grades_file())
 
-    def grade(self):
-        data = self._load_grades_file()
-        self.previous_grades = data
         self.jobs = []
+        # A grader kept alive by the daemon must probe the repositories again on every run
+        with self.probe_lock:
+            self.commit_hashes.clear()
 
-        for assignment in self.config.assignments:
-            self.log.info("Launching grading job for assignment: %s", assignment.name)
-            self._grade_assignment(assignment)
-
-        self.log.info("Waiting for all grading jobs to complete")
-        self.runner.wait_all()
+        self._schedule_assignments(repositories)
 
-        results = self._retrieve_results(data)
+        self.log.info("GitHub response cache: %(hits)d hits, %(misses)d misses", self.classroom.cache_stats)
+        self.log.info("GitHub API quota: %(requests)d requests this run (%(throttled)d paced, %(waited_s).1fs waited), %(remaining)s/%(limit)s left until %(reset_at).0f", self.classroom.quota)
 
-        self._save_grades_file(results)
\ No newline at end of file
+        with telemetry.span("results.materialize"):
+            self.results.materialize(Path(self.config.grader.grades_file))
\ No newline at end of file
@@ -0,0 +1,167 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from shutil import rmtree
+from typing import Any, Callable, Generic, Iterable, Iterator, Optional, TypeVar
+import os
+import threading
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def directory_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+@dataclass
+class Prefetched(Generic[T, R]):
+    item: T
+    value: Optional[R]
+    nbytes: int = 0
+    error: Optional[Exception] = None
+
+
+class PrefetchPipeline(Generic[T, R]):
+    """
+    Runs `prepare` on the upcoming items in a background thread while the caller
+    works on the current one. At most `depth` prepared items wait ahead of the
+    caller, and no new item is prepared while the prepared items that were not
+    released yet hold `disk_budget_bytes` or more (measured with `size`).
+
+        for prefetched in pipeline:
+            ...
+            pipeline.release(prefetched)
+
+    Items whose `prepare` raised are handed over with the exception in `error`
+    and no value, they must be released like the others.
+    """
+    def __init__(
+        self,
+        items: Iterable[T],
+        prepare: Callable[[T], R],
+        depth: int = 1,
+        disk_budget_bytes: Optional[int] = None,
+        size: Optional[Callable[[R], int]] = None,
+    ) -> None:
+        self.__items = items
+        self.__prepare = prepare
+        self.__depth = depth
+        self.__budget = disk_budget_bytes
+        self.__size = size
+
+        self.__cond = threading.Condition()
+        self.__ready: deque = deque()
+        self.__held = 0
+        self.__outstanding = 0
+        self.__closed = False
+        self.__thread = threading.Thread(target=self.__produce, daemon=True)
+
+    def __over_budget(self) -> bool:
+        # A single item larger than the budget is still prepared once nothing else is held
+        return self.__budget is not None and self.__outstanding > 0 and self.__held >= self.__budget
+
+    def __can_prepare(self) -> bool:
+        return self.__closed or (len(self.__ready) < self.__depth and not self.__over_budget())
+
+    def __push(self, entry: tuple) -> None:
+        with self.__cond:
+            self.__ready.append(entry)
+            self.__cond.notify_all()
+
+    def __produce(self) -> None:
+        try:
+            for item in self.__items:
+                with self.__cond:
+                    self.__cond.wait_for(self.__can_prepare)
+                    if self.__closed:
+                        return
+
+                prefetched = self.__prepared(item)
+                nbytes = self.__size(prefetched.value) if self.__size and prefetched.error is None else 0
+                with self.__cond:
+                    prefetched.nbytes = nbytes
+                    self.__held += nbytes
+                    self.__outstanding += 1
+                self.__push((prefetched, None))
+        except Exception as e:
+            self.__push((None, e))
+        self.__push(None)
+
+    def __prepared(self, item: T) -> Prefetched[T, R]:
+        try:
+            return Prefetched(item, self.__prepare(item))
+        except Exception as e:
+            return Prefetched(item, None, error=e)
+
+    def __iter__(self) -> Iterator[Prefetched[T, R]]:
+        if self.__depth == 0:
+            for item in self.__items:
+                with self.__cond:
+                    self.__outstanding += 1
+                yield self.__prepared(item)
+            return
+
+        self.__thread.start()
+        try:
+            while True:
+                with self.__cond:
+                    self.__cond.wait_for(lambda: self.__ready)
+                    entry = self.__ready.popleft()
+                    self.__cond.notify_all()
+
+                if entry is None:
+                    return
+                prefetched, error = entry
+                if error is not None:
+                    raise error
+                yield prefetched
+        finally:
+            self.close()
+
+    def release(self, prefetched: Prefetched[T, R]) -> None:
+        """Gives the disk space of a consumed item back to the budget."""
+        with self.__cond:
+            self.__held -= prefetched.nbytes
+            self.__outstanding -= 1
+            self.__cond.notify_all()
+
+    def close(self) -> None:
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify_all()
+
+
+class BackgroundCleaner:
+    """Deletes directories on a background thread so that grading doesn't wait for `rmtree`."""
+    def __init__(self) -> None:
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cleanup")
+        self.__pending: list[Future] = []
+
+    def remove(self, path: Path, callback: Optional[Callable[[], Any]] = None) -> None:
+        def remove_path() -> None:
+            try:
+                rmtree(path, ignore_errors=True)
+            finally:
+                if callback:
+                    callback()
+
+        self.__pending.append(self.__executor.submit(remove_path))
+
+    def wait(self) -> None:
+        """Waits for every pending removal."""
+        for future in self.__pending:
+            future.result()
+        self.__pending.clear()
+
+    def close(self) -> None:
+        self.wait()
+        self.__executor.shutdown(wait=True)
@@ -0,0 +1,114 @@
+from contextlib import contextmanager
+from pathlib import Path
+from shutil import rmtree
+from typing import Iterator, Optional
+from git import Repo
+from git.exc import GitCommandError
+from gh.structs import SubmissionInfo
+from config.configs import CloneConfig
+from telemetry import telemetry
+import fcntl
+
+
+class RepositoryStore:
+    """
+    Keeps a single bare clone per submission under the working directory.
+    The clone is fetched incrementally on every run and each task gets its own
+    lightweight working copy through `git worktree`.
+    """
+    def __init__(self, root: Path, pat: str) -> None:
+        self.root = root
+        self.pat = pat
+
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _authenticated_url(self, submission: SubmissionInfo) -> str:
+        return submission.repository.html_url.replace("https://", f"https://{self.pat}@")
+
+    def _store_dir(self, submission: SubmissionInfo) -> Path:
+        return self.root / (submission.repository.full_name.replace('/', '_') + ".git")
+
+    @contextmanager
+    def _locked(self, store_dir: Path) -> Iterator[None]:
+        # Tasks of the same submission may run at the same time in different jobs
+        with open(store_dir.with_suffix(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _transfer_options(options: CloneConfig) -> dict:
+        kwargs = {}
+        if options.depth:
+            kwargs["depth"] = options.depth
+        if options.filter:
+            kwargs["filter"] = options.filter
+        return kwargs
+
+    def _sync(self, submission: SubmissionInfo, store_dir: Path, options: CloneConfig) -> Repo:
+        repo_url = self._authenticated_url(submission)
+        branch = submission.repository.default_branch
+        kwargs = self._transfer_options(options)
+
+        if not store_dir.exists():
+            if options.single_branch:
+                kwargs.update(single_branch=True, branch=branch)
+            with telemetry.span("git.clone", repo=submission.repository.full_name):
+                return Repo.clone_from(repo_url, store_dir, bare=True, **kwargs)
+
+        repo = Repo(store_dir)
+        # Forget worktrees whose directories were deleted after a previous run
+        repo.git.worktree("prune")
+        # Keep the stored remote in sync with the current PAT, partial clones lazily fetch blobs from it
+        repo.git.remote("set-url", "origin", repo_url)
+
+        refspec = f"+refs/heads/{branch}:refs/heads/{branch}" if options.single_branch else "+refs/heads/*:refs/heads/*"
+        with telemetry.span("git.fetch", repo=submission.repository.full_name):
+            repo.git.fetch("origin", refspec, "--prune", "--update-head-ok", **kwargs)
+        return repo
+
+    @staticmethod
+    def _has_commit(repo: Repo, commit_hash: str) -> bool:
+        try:
+            repo.git.cat_file("-e", f"{commit_hash}^{{commit}}")
+        except GitCommandError:
+            return False
+        return True
+
+    def checkout(self, submission: SubmissionInfo, commit_hash: Optional[str], dest: Path, options: Optional[CloneConfig] = None) -> str:
+        """
+        Materializes `commit_hash` (or the remote HEAD when it is unknown) into `dest`
+        and returns the hash of the commit that was checked out.
+        """
+        options = options or CloneConfig()
+        store_dir = self._store_dir(submission)
+
+        with self._locked(store_dir):
+            repo = self._sync(submission, store_dir, options)
+
+            if dest.exists():
+                rmtree(dest)
+                repo.git.worktree("prune")
+
+            if commit_hash is None or not self._has_commit(repo, commit_hash):
+                commit_hash = repo.head.commit.hexsha
+
+            if not options.sparse_checkout:
+                with telemetry.span("git.worktree", repo=submission.repository.full_name):
+                    repo.git.worktree("add", "--detach", "--force", str(dest), commit_hash)
+                return commit_hash
+
+            repo.git.worktree("add", "--detach", "--force", "--no-checkout", str(dest), commit_hash)
+
+        # Write the patterns in the worktree private git dir and enable sparse checkout only for
+        # this read-tree: `git sparse-checkout` would rewrite the shared config of the bare store
+        worktree = Repo(dest)
+        sparse_file = Path(worktree.git_dir) / "info" / "sparse-checkout"
+        sparse_file.parent.mkdir(parents=True, exist_ok=True)
+        sparse_file.write_text("\n".join(options.sparse_checkout) + "\n")
+        with telemetry.span("git.worktree", repo=submission.repository.full_name):
+            worktree.git(c="core.sparseCheckout=true").read_tree("-mu", "HEAD")
+
+        return commit_hash
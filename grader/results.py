@@ -0,0 +1,108 @@
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+from .structs import GradeResult
+import json
+import os
+import time
+
+# Keys of a grading result that are not worth persisting
+_TRANSIENT_KEYS = ("repo_dir",)
+
+
+class ResultsLog:
+    """
+    Append-only JSON-lines log of every collected grading result, one line per
+    (assignment, task, student) result. Results are appended as soon as they are
+    collected, so a dashboard can tail the file, and the leaderboard is
+    materialized from the latest entry of every student and task.
+    """
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def append(self, assignment: str, task: str, results: list[dict[str, Any]]) -> None:
+        now = time.time()
+        with open(self.path, "a") as log_file:
+            for result in results:
+                entry = {key: value for key, value in result.items() if key not in _TRANSIENT_KEYS}
+                entry.update(assignment=assignment, task=task, ts=now)
+                log_file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            log_file.flush()
+            os.fsync(log_file.fileno())
+
+    def seed(self, grades: dict[str, list[dict[str, Any]]]) -> None:
+        """Converts a leaderboard written before the log existed into log entries."""
+        for assignment, students in grades.items():
+            for student in students:
+                for task in student.get("tasks", []):
+                    data = student.get("data", {}).get(task)
+                    self.append(assignment, task, [{
+                        "name": student["name"],
+                        "commit_hash": student.get("commit_hash", ""),
+                        "status": student.get("status", {}).get(task, ""),
+                        "error": student.get("error", {}).get(task, ""),
+                        "stdout": student.get("stdout", {}).get(task, ""),
+                        "runtimes": (data or {}).get("times", []),
+                        "stats": student.get("runtime_stats", {}).get(task),
+                        "data": data,
+                    }])
+
+    def __entries(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        if not self.path.exists():
+            return
+        with open(self.path, "r") as log_file:
+            for line in log_file:
+                line = line.strip()
+                if line:
+                    yield line, json.loads(line)
+
+    def fold(self) -> tuple[dict[str, dict[str, GradeResult]], dict[tuple[str, str, str], str], int]:
+        """
+        Replays the log keeping only the latest result of every student and task.
+        Also returns the log line of each of these results, oldest first, and the
+        number of lines read.
+        """
+        grades: dict[str, dict[str, GradeResult]] = defaultdict(dict)
+        latest: dict[tuple[str, str, str], str] = {}
+        lines = 0
+
+        for line, entry in self.__entries():
+            lines += 1
+            students = grades[entry["assignment"]]
+            if entry["name"] not in students:
+                students[entry["name"]] = GradeResult(entry["name"], "", {}, {}, {}, {}, {})
+            students[entry["name"]].update_from_dict(entry, entry["task"])
+
+            key = (entry["assignment"], entry["task"], entry["name"])
+            latest.pop(key, None)
+            latest[key] = line
+
+        return grades, latest, lines
+
+    def materialize(self, grades_file: Path) -> dict[str, list[dict[str, Any]]]:
+        grades, latest, lines = self.fold()
+        leaderboard = {assignment: [student.to_dict() for student in students.values()] for assignment, students in grades.items()}
+
+        # Atomic rename, readers never see a half written leaderboard
+        tmp_path = grades_file.with_name(grades_file.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(leaderboard, f, indent=4)
+        os.replace(tmp_path, grades_file)
+
+        if lines > 2 * len(latest):
+            self.compact(latest.values())
+
+        return leaderboard
+
+    def compact(self, lines: Iterable[str]) -> None:
+        """Rewrites the log with only the given lines, the entries the leaderboard is built from, kept verbatim."""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as log_file:
+            for line in lines:
+                log_file.write(line + "\n")
+            log_file.flush()
+            os.fsync(log_file.fileno())
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from logging import Logger
+from runners import ABRunner
+from typing import Callable, Hashable, Optional
+from .exceptions import GraderException
+from telemetry import telemetry
+import logging
+import time
+
+# A failed task still releases its dependents, it failed on its own and not because of them
+_COMPLETED_STATES = ("done", "failed")
+
+
+@dataclass
+class _Node:
+    key: Hashable
+    depends_on: list[Hashable]
+    ready: Callable[[], bool]
+    submit: Callable[[], Optional[int]]
+    collect: Optional[Callable[[int], None]] = None
+    job_id: Optional[int] = None
+    state: str = "pending"
+
+
+class TaskScheduler:
+    """
+    Submits grading tasks as soon as every task they depend on has completed,
+    instead of waiting for blocking tasks inline. `ready` tells whether the
+    inputs of a task (e.g. its assignment's submissions) are available, `submit`
+    launches it on the runner and returns its job id, or None when nothing was
+    launched, in which case its dependents are released right away.
+
+    The states of all running jobs are polled with a single runner query, and
+    `collect` is called as soon as a job is done, so the results of a task are
+    published without waiting for slower ones. A failing `submit` or `collect` is
+    logged and does not affect the other tasks.
+    """
+    def __init__(self, runner: ABRunner, poll_interval: float = 2.0, logger: Optional[Logger] = None) -> None:
+        self.runner = runner
+        self.poll_interval = poll_interval
+        self.log = logger or logging.getLogger("grader")
+        self.__nodes: dict[Hashable, _Node] = {}
+
+    def add(self, key: Hashable, depends_on: list[Hashable], ready: Callable[[], bool], submit: Callable[[], Optional[int]], collect: Optional[Callable[[int], None]] = None) -> None:
+        self.__nodes[key] = _Node(key, depends_on, ready, submit, collect)
+
+    def __dependencies_completed(self, node: _Node) -> bool:
+        return all(self.__nodes[dependency].state in _COMPLETED_STATES for dependency in node.depends_on)
+
+    def __submit(self, node: _Node) -> None:
+        try:
+            node.job_id = node.submit()
+        except Exception:
+            # e.g. the submissions of its assignment could not be fetched, other assignments go on
+            self.log.exception("Failed to submit task %s", node.key)
+            telemetry.count("tasks.submit_failed")
+            node.state = "failed"
+            return
+        node.state = "done" if node.job_id is None else "running"
+
+    def __collect(self, node: _Node) -> None:
+        if node.collect is None:
+            return
+        try:
+            node.collect(node.job_id)
+        except Exception:
+            self.log.exception("Failed to collect the results of task %s", node.key)
+            telemetry.count("tasks.collect_failed")
+
+    def run(self) -> None:
+        for node in self.__nodes.values():
+            for dependency in node.depends_on:
+                if dependency not in self.__nodes:
+                    raise GraderException(f"Task {node.key} depends on unknown task {dependency}")
+
+        while True:
+            progressed = False
+
+            running = [node for node in self.__nodes.values() if node.state == "running"]
+            finished = self.runner.finished([node.job_id for node in running]) if running else set()
+            for node in running:
+                if node.job_id in finished:
+                    self.log.info("Task %s completed", node.key)
+                    node.state = "done"
+                    progressed = True
+                    self.__collect(node)
+
+            # ready() flips while the scheduler runs (e.g. a fetch completes), read it once per
+            # iteration so that the submit decision and the deadlock check agree
+            ready = {node.key: node.ready() for node in self.__nodes.values() if node.state == "pending"}
+            for node in self.__nodes.values():
+                if node.state == "pending" and ready[node.key] and self.__dependencies_completed(node):
+                    self.__submit(node)
+                    progressed = True
+
+            states = {node.state for node in self.__nodes.values()}
+            if states <= set(_COMPLETED_STATES):
+                failed = [node.key for node in self.__nodes.values() if node.state == "failed"]
+                if failed:
+                    self.log.error("Tasks %s could not be submitted", failed)
+                return
+            if "running" not in states and not progressed and all(ready[node.key] for node in self.__nodes.values() if node.state == "pending"):
+                raise GraderException(f"Tasks {[node.key for node in self.__nodes.values() if node.state == 'pending']} can never run, check depends_on")
+
+            if not progressed:
+                time.sleep(self.poll_interval)
@@ -0,0 +1,42 @@
+from pathlib import Path
+from typing import Iterator, Sequence, TypeVar
+import fcntl
+
+T = TypeVar("T")
+
+
+def static_shard(items: Sequence[T], rank: int, world_size: int) -> list[T]:
+    # Round-robin so that every rank gets a similar share even when the list is sorted
+    return list(items[rank::world_size])
+
+
+class WorkQueue:
+    """
+    Counter stored in a file shared by every rank of a job. Each claim atomically
+    hands out the next unprocessed index, so faster ranks steal work from slower ones.
+    """
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    @staticmethod
+    def create(path: Path) -> "WorkQueue":
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("0")
+        return WorkQueue(path)
+
+    def claim(self) -> int:
+        with open(self.path, "r+") as queue_file:
+            fcntl.flock(queue_file, fcntl.LOCK_EX)
+            try:
+                idx = int(queue_file.read() or 0)
+                queue_file.seek(0)
+                queue_file.truncate()
+                queue_file.write(str(idx + 1))
+                queue_file.flush()
+            finally:
+                fcntl.flock(queue_file, fcntl.LOCK_UN)
+        return idx
+
+    def iterate(self, items: Sequence[T]) -> Iterator[T]:
+        while (idx := self.claim()) < len(items):
+            yield items[idx]
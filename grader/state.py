@@ -0,0 +1,124 @@
+from pathlib import Path
+from typing import Iterable, Optional
+import sqlite3
+import threading
+import time
+
+PENDING = "pending"
+# Handed to the runner. Recorded by the grader once the job is submitted, a crash before
+# its results are collected leaves it running and it is graded again on the next run
+RUNNING = "running"
+GRADED = "graded"
+ERROR = "error"
+TIMEOUT = "timeout"
+# Graded, but the runtimes were too noisy to rank: measured again on the next run,
+# until the same commit was noisy the task's max_noisy_runs times in a row
+NOISY = "noisy"
+# The repository couldn't be checked out, e.g. a network or authentication hiccup:
+# nothing was graded, so the commit is tried again on the next run
+CHECKOUT_FAILED = "checkout_failed"
+
+# States whose result was collected, the commit doesn't need to be graded again
+COMPLETED_STATES = (GRADED, ERROR, TIMEOUT)
+
+
+class StateStore:
+    """
+    Transactional SQLite store of the grading state of every submission, keyed by
+    (assignment, task, repository, commit). Runs in WAL mode so that the grader's
+    threads can read while another one commits.
+
+    Only the grader process opens the database. WAL relies on memory shared by
+    every connection, so grading jobs on other nodes must never write to it even
+    though the file lives on the shared working directory.
+    """
+    def __init__(self, path: Path, timeout: float = 30.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.__local = threading.local()
+
+        with self.__transaction() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS submissions (
+                    assignment TEXT NOT NULL,
+                    task TEXT NOT NULL,
+                    repo TEXT NOT NULL,
+                    commit_hash TEXT NOT NULL,
+                    perf_hash TEXT,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    noisy_runs INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (assignment, task, repo, commit_hash)
+                )
+            """)
+            # Databases created before noisy_runs existed
+            columns = {name for _, name, *_ in connection.execute("PRAGMA table_info(submissions)")}
+            if "noisy_runs" not in columns:
+                connection.execute("ALTER TABLE submissions ADD COLUMN noisy_runs INTEGER NOT NULL DEFAULT 0")
+
+    def __getstate__(self) -> dict:
+        return {"path": self.path, "timeout": self.timeout}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.__local = threading.local()
+
+    def __connection(self) -> sqlite3.Connection:
+        # sqlite connections can't be shared across threads or forked processes
+        connection = getattr(self.__local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.__local.connection = connection
+        return connection
+
+    def __transaction(self) -> "_Transaction":
+        return _Transaction(self.__connection())
+
+    def completed(self, assignment: str, task: str, perf_hash: str, max_noisy_runs: Optional[int] = None) -> set[tuple[str, str]]:
+        """Returns the (repo, commit) entries that don't need to be graded again, including commits noisy `max_noisy_runs` times."""
+        rows = self.__connection().execute(
+            f"""
+            SELECT repo, commit_hash FROM submissions WHERE assignment = ? AND task = ? AND perf_hash = ?
+            AND (state IN ({', '.join('?' * len(COMPLETED_STATES))}) OR (? IS NOT NULL AND noisy_runs >= ?))
+            """,
+            (assignment, task, perf_hash, *COMPLETED_STATES, max_noisy_runs, max_noisy_runs),
+        )
+        return {(repo, commit_hash) for repo, commit_hash in rows}
+
+    def perf_hashes(self, assignment: str, task: str) -> set[str]:
+        rows = self.__connection().execute("SELECT DISTINCT perf_hash FROM submissions WHERE assignment = ? AND task = ?", (assignment, task))
+        return {perf_hash for (perf_hash,) in rows}
+
+    def mark(self, assignment: str, task: str, entries: Iterable[tuple[str, str]], state: str, perf_hash: Optional[str] = None) -> None:
+        """Sets the state of every (repo, commit) entry in a single transaction, counting how often each was noisy."""
+        now = time.time()
+        with self.__transaction() as connection:
+            connection.executemany(
+                """
+                INSERT INTO submissions (assignment, task, repo, commit_hash, perf_hash, state, updated_at, noisy_runs) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (assignment, task, repo, commit_hash) DO UPDATE SET
+                    state = excluded.state,
+                    perf_hash = COALESCE(excluded.perf_hash, submissions.perf_hash),
+                    updated_at = excluded.updated_at,
+                    noisy_runs = CASE
+                        WHEN excluded.perf_hash IS NOT NULL AND excluded.perf_hash IS NOT submissions.perf_hash THEN excluded.noisy_runs
+                        ELSE submissions.noisy_runs + excluded.noisy_runs
+                    END
+                """,
+                [(assignment, task, repo, commit_hash, perf_hash, state, now, int(state == NOISY)) for repo, commit_hash in entries],
+            )
+
+
+class _Transaction:
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        # Take the write lock up front to avoid deadlocking with other writers
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
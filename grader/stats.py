@@ -0,0 +1,94 @@
+from dataclasses import dataclass, asdict
+from typing import Optional, Sequence
+import numpy as np
+
+BOOTSTRAP_SAMPLES = 2000
+# A script may report any number of runtimes, bounds the memory of the bootstrap
+BOOTSTRAP_MAX_VALUES = 5000
+BOOTSTRAP_CHUNK_ELEMENTS = 1_000_000
+
+
+@dataclass
+class RuntimeStats:
+    """Summary of the runtimes reported by a test script, after discarding the warm-up runs."""
+    samples: int
+    discarded: int
+    mean: float
+    median: float
+    trimmed_mean: float
+    min: float
+    stddev: float
+    cv: float
+    ci_low: float
+    ci_high: float
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def is_noisy(self, max_cv: Optional[float]) -> bool:
+        return max_cv is not None and self.cv > max_cv
+
+
+def trimmed_mean(values: np.ndarray, proportion: float) -> float:
+    # Drops `proportion` of the sorted samples from each end
+    cut = int(len(values) * proportion)
+    kept = np.sort(values)[cut:len(values) - cut]
+    return float(kept.mean())
+
+
+def bootstrap_ci(values: np.ndarray, confidence: float = 0.95, samples: int = BOOTSTRAP_SAMPLES, seed: int = 0) -> tuple[float, float]:
+    """
+    Percentile bootstrap confidence interval of the median. Long series are
+    subsampled to BOOTSTRAP_MAX_VALUES and resampled in chunks.
+    """
+    if len(values) < 2:
+        return float(values[0]), float(values[0])
+
+    # Fixed seed, regrading the same runtimes must not move the interval
+    rng = np.random.default_rng(seed)
+    if len(values) > BOOTSTRAP_MAX_VALUES:
+        values = rng.choice(values, size=BOOTSTRAP_MAX_VALUES, replace=False)
+
+    rows = max(BOOTSTRAP_CHUNK_ELEMENTS // len(values), 1)
+    medians = np.concatenate([
+        np.median(values[rng.integers(0, len(values), size=(min(rows, samples - start), len(values)))], axis=1)
+        for start in range(0, samples, rows)
+    ])
+    alpha = (1.0 - confidence) / 2
+    low, high = np.quantile(medians, [alpha, 1.0 - alpha])
+    return float(low), float(high)
+
+
+def summarize(times: Sequence[float], warmup_runs: int = 0, trim: float = 0.1, confidence: float = 0.95) -> Optional[RuntimeStats]:
+    """Returns None when no runtime is left once the warm-up runs are discarded."""
+    # Keep every run when the script reported fewer runs than the warm-up to discard
+    discarded = warmup_runs if len(times) > warmup_runs else 0
+    values = np.asarray(times[discarded:], dtype=np.float64)
+    if values.size == 0:
+        return None
+
+    mean = float(values.mean())
+    stddev = float(values.std(ddof=1)) if values.size > 1 else 0.0
+    ci_low, ci_high = bootstrap_ci(values, confidence)
+
+    return RuntimeStats(
+        samples=int(values.size),
+        discarded=discarded,
+        mean=mean,
+        median=float(np.median(values)),
+        trimmed_mean=trimmed_mean(values, trim),
+        min=float(values.min()),
+        stddev=stddev,
+        cv=stddev / mean if mean > 0 else 0.0,
+        ci_low=ci_low,
+        ci_high=ci_high,
+    )
+
+
+def summarize_trials(trials: Sequence[Sequence[float]], warmup_runs: int = 0, trim: float = 0.1, confidence: float = 0.95) -> Optional[RuntimeStats]:
+    """Pools the runtimes of repeated trials, every trial is a new process and discards its own warm-up runs."""
+    kept = [times[warmup_runs:] if len(times) > warmup_runs else times for times in trials]
+    stats = summarize([value for times in kept for value in times], 0, trim, confidence)
+    if stats is not None:
+        stats.discarded = sum(len(times) for times in trials) - stats.samples
+    return stats
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional
 
 @dataclass
 class GradeResult:
@@ -9,8 +10,13 @@ class GradeResult:
     stdout: dict[str, str]
     runtimes: dict[str, list[float]]
     data: dict[str, dict]
+    stats: dict[str, Optional[dict]] = field(default_factory=dict)
 
     def __avg_runtime(self, task_name: str) -> float:
+        # Results graded with runtime statistics exclude the warm-up runs
+        stats = self.stats.get(task_name)
+        if stats:
+            return stats["mean"]
         times = self.runtimes.get(task_name, [])
         if not times:
             return 0.0
@@ -25,6 +31,7 @@ class GradeResult:
             "error": self.error,
             "stdout": self.stdout,
             "avg_runtime": {task: self.__avg_runtime(task) for task in self.runtimes},
+            "runtime_stats": {task: stats for task, stats in self.stats.items() if stats},
             "data": self.data
         }
     
@@ -35,4 +42,5 @@ class GradeResult:
         self.error[task_name] = info.get("error", self.error)
         self.stdout[task_name] = info.get("stdout", self.stdout)
         self.runtimes[task_name] = info.get("runtimes", [])
+        self.stats[task_name] = info.get("stats")
         self.data[task_name] = info.get("data", self.data)
\ No newline at end of file
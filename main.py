@@ -1,10 +1,17 @@
 from grader.grader import Grader
+from grader.daemon import GraderDaemon
 from config import ConfigParser
 from logger import build_logger
+import argparse
 import sentry_sdk
+import signal
 import os
 
 def main():
+    parser = argparse.ArgumentParser(description="Grades the GitHub Classroom submissions listed in grader-config.yaml.")
+    parser.add_argument("--daemon", action="store_true", help="keep running, grade repositories when they are pushed to and poll the rest periodically")
+    args = parser.parse_args()
+
     logger = build_logger(log_file="grader.log")
 
     config = ConfigParser("grader-config.yaml")
@@ -25,7 +32,15 @@ def main():
         logger.info("No Sentry DSN provided; skipping Sentry initialization.")
 
     grader = Grader(config.config, token, logger)
-    grader.grade()
+    if not args.daemon:
+        grader.grade()
+        return
+
+    daemon_config = config.config.grader.daemon
+    daemon_config.webhook_secret = os.getenv("GH_WEBHOOK_SECRET") or daemon_config.webhook_secret
+    daemon = GraderDaemon(grader, daemon_config, logger)
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    daemon.run()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -14,6 +14,14 @@ class ABRunner(ABC):
     def wait(self, jobid: int) -> None:
         raise NotImplementedError()
 
+    @abstractmethod
+    def done(self, jobid: int) -> bool:
+        raise NotImplementedError()
+
+    def finished(self, jobids: list[int]) -> set[int]:
+        """Returns which of `jobids` are done, runners backed by a cluster answer with a single query."""
+        return {jobid for jobid in jobids if self.done(jobid)}
+
     @abstractmethod
     def collect_results(self, jobid: int) -> dict:
         raise NotImplementedError()
\ No newline at end of file
@@ -0,0 +1,131 @@
+from .ABRunner import ABRunner
+from config.configs import AssignmentTaskConfig
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+from logging import Logger
+from typing import Callable, Optional
+import multiprocessing
+import logging
+import os
+
+# Set once per worker process by _init_worker
+_worker_slot: int = 0
+_available_cores: list[int] = []
+
+def _init_worker(counter) -> None:
+    global _worker_slot, _available_cores
+    with counter.get_lock():
+        _worker_slot = counter.value
+        counter.value += 1
+    _available_cores = sorted(os.sched_getaffinity(0))
+
+def _cores_per_worker(task: AssignmentTaskConfig) -> int:
+    # benchmark.pin_cores pins the test script to the last cores of the worker's affinity,
+    # every worker then needs its own cores or concurrent scripts would all land on the same ones
+    cpus = task.local_backend.cpus if task.local_backend.pin_cpus else 0
+    return max(cpus or 0, task.benchmark.pin_cores or 0)
+
+def _run_isolated(grading_function: Callable, task: AssignmentTaskConfig, args: tuple, kwargs: dict):
+    # local_backend.mem_gb is applied to the test script by the grader, not to the whole worker
+    previous_affinity = os.sched_getaffinity(0)
+
+    cores_per_worker = _cores_per_worker(task)
+    if cores_per_worker:
+        # Every worker owns a disjoint set of cores, so concurrent submissions don't disturb each other's timings
+        start = (_worker_slot * cores_per_worker) % len(_available_cores)
+        cores = [_available_cores[(start + i) % len(_available_cores)] for i in range(cores_per_worker)]
+        os.sched_setaffinity(0, cores)
+
+    try:
+        return grading_function(task, *args, **kwargs)
+    finally:
+        os.sched_setaffinity(0, previous_affinity)
+
+class LocalRunner(ABRunner):
+    """
+    Grades on the current host with a pool of worker processes, one submission
+    per pool task, so that several submissions are graded at the same time.
+    """
+    def __init__(self, max_workers: Optional[int] = None, logger: Optional[Logger] = None):
+        super().__init__()
+        self.max_workers = max_workers or os.cpu_count()
+        self.pool = self.__new_pool()
+        self.futures: list[list[Future]] = []
+        # Pool each job was submitted to, to tell whether the current pool is the one that broke
+        self.job_pools: list[Optional[ProcessPoolExecutor]] = []
+        self.log = logger or logging.getLogger("grader")
+
+    def __new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(multiprocessing.Value("i", 0),),
+        )
+
+    def __replace_pool(self, broken: ProcessPoolExecutor) -> None:
+        # A worker that died abruptly (e.g. killed by the OOM killer) breaks the whole pool for good
+        if self.pool is broken:
+            self.log.warning("A local grading process died, starting a new process pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = self.__new_pool()
+
+    def __submit(self, task: AssignmentTaskConfig, batches: list[list], grading_function: Callable, args: tuple, kwargs: dict) -> list[Future]:
+        return [
+            self.pool.submit(_run_isolated, grading_function, task, (batch,) + args, kwargs)
+            for batch in batches
+        ]
+
+    def run(self, grading_function: Callable[[AssignmentTaskConfig, ...]], task: AssignmentTaskConfig, submissions: list, *args, **kwargs) -> int:
+        cores_per_worker = _cores_per_worker(task)
+        if cores_per_worker and self.max_workers * cores_per_worker > os.cpu_count():
+            self.log.warning("Not enough cores to pin %d workers to %d cores each, pinned sets of %s will overlap", self.max_workers, cores_per_worker, task.name)
+        if task.local_backend.cpus and not task.local_backend.pin_cpus:
+            self.log.warning("local_backend.cpus of %s has no effect without pin_cpus", task.name)
+
+        # Submissions are fanned out by the pool, there are no ranks to shard across
+        task = replace(task, distribution="rank0")
+
+        # Interleaved benchmark trials run in a single worker, concurrent submissions would disturb each other's timings
+        if task.benchmark.trials > 1 and task.benchmark.interleave:
+            batches = [submissions] if submissions else []
+        else:
+            batches = [[submission] for submission in submissions]
+
+        try:
+            futures = self.__submit(task, batches, grading_function, args, kwargs)
+        except BrokenProcessPool:
+            self.__replace_pool(self.pool)
+            futures = self.__submit(task, batches, grading_function, args, kwargs)
+
+        jobid = len(self.futures)
+        self.futures.append(futures)
+        self.job_pools.append(self.pool)
+        return jobid
+
+    def wait_all(self) -> None:
+        wait([future for futures in self.futures for future in futures])
+
+    def wait(self, jobid: int) -> None:
+        wait(self.futures[jobid])
+
+    def done(self, jobid: int) -> bool:
+        return all(future.done() for future in self.futures[jobid])
+
+    def collect_results(self, jobid: int) -> dict:
+        results = []
+
+        for future in self.futures[jobid]:
+            try:
+                results.extend(future.result())
+            except BrokenProcessPool as e:
+                # Its submissions stay pending and are graded again by the next run
+                self.log.error("Local grading process died, skipping its results: %s", e)
+                self.__replace_pool(self.job_pools[jobid])
+            except Exception as e:
+                self.log.error("Local grading process failed, skipping its results: %s", e)
+
+        # Results are collected once, a long-running grader must not keep them around
+        self.futures[jobid] = []
+        self.job_pools[jobid] = None
+        return results
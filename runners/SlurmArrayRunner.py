@@ -0,0 +1,70 @@
+from .SlurmRunner import SlurmRunner
+from config.configs import AssignmentTaskConfig
+from submitit import Job
+from submitit.core.utils import FailedJobError, UncompletedJobError
+from dataclasses import replace
+from functools import partial
+from logging import Logger
+from typing import Callable, Optional
+
+class SlurmArrayRunner(SlurmRunner):
+    """
+    Submits one SLURM array element per (task, submission) pair, so the scheduler
+    can spread the submissions of a task over idle nodes instead of grading
+    them one after another inside a single allocation.
+    """
+    def __init__(self, logs_folder: str = "./logs", logger: Optional[Logger] = None):
+        super().__init__(logs_folder, logger)
+        self.arrays: list[list[Job]] = []
+
+    def run(self, grading_function: Callable[[AssignmentTaskConfig, ...]], task: AssignmentTaskConfig, submissions: list, *args, **kwargs) -> int:
+        # Every element grades a single submission, there is nothing left to shard across ranks
+        element_task = replace(task, distribution="rank0")
+
+        # Interleaved benchmark trials must run on the same node, all submissions go to one element
+        if task.benchmark.trials > 1 and task.benchmark.interleave:
+            elements = [submissions] if submissions else []
+        else:
+            elements = [[submission] for submission in submissions]
+
+        self.executor.update_parameters(**self._executor_parameters(task, False))
+        jobs: list[Job] = self.executor.map_array(
+            partial(grading_function, **kwargs),
+            [element_task] * len(elements),
+            elements,
+            *[[arg] * len(elements) for arg in args],
+        ) if elements else []
+
+        jobid = self.job_idx
+        self.arrays.append(jobs)
+        self.job_idx += 1
+        return jobid
+
+    def wait_all(self) -> None:
+        for jobs in self.arrays:
+            for job in jobs:
+                job.wait()
+
+    def wait(self, jobid: int) -> None:
+        for job in self.arrays[jobid]:
+            job.wait()
+
+    def done(self, jobid: int) -> bool:
+        return all(job.done() for job in self.arrays[jobid])
+
+    def finished(self, jobids: list[int]) -> set[int]:
+        self._refresh([job for jobid in jobids for job in self.arrays[jobid]])
+        return {jobid for jobid in jobids if self.done(jobid)}
+
+    def collect_results(self, jobid: int) -> dict:
+        results = []
+
+        for job in self.arrays[jobid]:
+            sub_job = job._sub_jobs[0] if job._sub_jobs else job
+            try:
+                results.extend(sub_job.results()[0])
+            except (FailedJobError, UncompletedJobError) as e:
+                # Losing one element must not discard the results of the rest of the array
+                self.log.error("Array element %s failed, skipping its results: %s", job.job_id, e)
+
+        return results
@@ -2,28 +2,46 @@ from .ABRunner import ABRunner
 from config.configs import AssignmentTaskConfig
 import submitit
 from submitit import Job
+from submitit.slurm.slurm import SlurmInfoWatcher
 from typing import Callable
 from submitit.core.core import R
+from submitit.core.utils import FailedJobError, UncompletedJobError
+from logging import Logger
+from typing import Optional
+import logging
 import typing as tp
 
 class SlurmRunner(ABRunner):
-    def __init__(self, logs_folder: str = "./logs"):
+    def __init__(self, logs_folder: str = "./logs", logger: Optional[Logger] = None):
         super().__init__()
         self.executor = submitit.AutoExecutor(folder=logs_folder)
+        self.log = logger or logging.getLogger("grader")
         self.jobs: list[Job] = []
+        self.sharded: list[bool] = []
         self.job_idx = 0
 
-    def run(self, grading_function: Callable[[AssignmentTaskConfig, ...]], task: AssignmentTaskConfig, *args, **kwargs) -> int:
-        if not task.slurm_backend.config.get("slurm_job_name"):
-            task.slurm_backend.config["slurm_job_name"] = f"grading_{task.name}"
+    @staticmethod
+    def _executor_parameters(task: AssignmentTaskConfig, use_srun: bool) -> dict:
+        # Work on a copy, the task config is hashed again when its results are collected
+        config = dict(task.slurm_backend.config)
+        if not config.get("slurm_job_name"):
+            config["slurm_job_name"] = f"grading_{task.name}"
+        config["slurm_use_srun"] = use_srun
+
+        # No other job shares the node while the submissions are timed. Always set, submitit
+        # merges the parameters of successive updates, None clears an earlier --exclusive
+        config["slurm_exclusive"] = True if task.benchmark.exclusive else None
+        return config
 
-        config = task.slurm_backend.config
-        config["slurm_use_srun"] = False  # We are already running inside a SLURM job\
+    def run(self, grading_function: Callable[[AssignmentTaskConfig, ...]], task: AssignmentTaskConfig, *args, **kwargs) -> int:
+        # Sharded tasks need one process per rank, otherwise we are already running inside a SLURM job
+        sharded = task.distribution != "rank0"
 
-        self.executor.update_parameters(**config)
+        self.executor.update_parameters(**self._executor_parameters(task, sharded))
         job: Job = self.executor.submit(grading_function, *[task] + list(args), **kwargs)
         jobid = self.job_idx
         self.jobs.append(job)
+        self.sharded.append(sharded)
         self.job_idx += 1
         return jobid
     
@@ -34,10 +52,37 @@ class SlurmRunner(ABRunner):
     def wait(self, jobid: int) -> None:
         job = self.jobs[jobid]
         job.wait()
+
+    def done(self, jobid: int) -> bool:
+        return self.jobs[jobid].done()
+
+    @staticmethod
+    def _refresh(jobs: list[Job]) -> None:
+        # All SLURM jobs share submitit's watcher, a single sacct call updates every one of them
+        # and the done() checks that follow are answered from its cache. The call is paced by
+        # submitit (2s after a submission, backing off to once a minute), not by our poll interval.
+        # Without SLURM, AutoExecutor falls back to local jobs whose done() needs no watcher.
+        if jobs and isinstance(jobs[0].watcher, SlurmInfoWatcher):
+            jobs[0].watcher.update_if_long_enough("standard")
+
+    def finished(self, jobids: list[int]) -> set[int]:
+        self._refresh([self.jobs[jobid] for jobid in jobids])
+        return {jobid for jobid in jobids if self.done(jobid)}
     
     def collect_results(self, jobid: int) -> dict:
         job = self.jobs[jobid]
 
+        if self.sharded[jobid]:
+            # Every rank graded its own share of the submissions, merge them back together
+            results = []
+            for rank, rank_job in enumerate(job._sub_jobs or [job]):
+                try:
+                    results.extend(rank_job.results()[0])
+                except (FailedJobError, UncompletedJobError) as e:
+                    # Losing one rank must not discard the results of the others, its submissions are graded again next run
+                    self.log.error("Rank %d of job %s failed, skipping its results: %s", rank, job.job_id, e)
+            return results
+
         # You shouldn't access private members of a class like this
         # but I need to "hack" the library in such a way that id doesn't
         # parse jobs results past rank #0
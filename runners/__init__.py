@@ -1,2 +1,4 @@
 from .ABRunner import ABRunner
-from .SlurmRunner import SlurmRunner
\ No newline at end of file
+from .SlurmRunner import SlurmRunner
+from .SlurmArrayRunner import SlurmArrayRunner
+from .LocalRunner import LocalRunner
\ No newline at end of file
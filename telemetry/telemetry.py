@@ -0,0 +1,204 @@
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Optional
+import json
+import os
+import re
+import socket
+import threading
+import time
+
+TRACE_FILE = "trace.json"
+METRICS_FILE = "grader.prom"
+
+
+class _Span:
+    __slots__ = ("telemetry", "name", "args", "wall", "start")
+
+    def __init__(self, telemetry: "Telemetry", name: str, args: dict) -> None:
+        self.telemetry = telemetry
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.telemetry.record(self.name, self.wall, self.wall + time.perf_counter() - self.start, **self.args)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Telemetry:
+    """
+    In-process recorder of timed spans and counters. Every grading process
+    (the grader itself, SLURM ranks, array elements, local workers) records into
+    its own instance and flushes it to a shared directory; the grader then merges
+    all of them into a Chrome/Perfetto trace and a Prometheus textfile.
+
+        with telemetry.span("git.clone", repo=name):
+            ...
+        telemetry.count("github.requests")
+    """
+    def __init__(self) -> None:
+        self.enabled = True
+        self.__lock = threading.Lock()
+        self.__reset()
+        # A forked worker must not flush the events of its parent again
+        os.register_at_fork(after_in_child=self.__after_fork)
+
+    def __after_fork(self) -> None:
+        self.__lock = threading.Lock()
+        self.__reset()
+
+    def __reset(self) -> None:
+        self.__events: list[tuple] = []
+        self.__spans: dict[str, list[float]] = defaultdict(lambda: [0, 0.0])
+        self.__counters: dict[str, float] = defaultdict(float)
+
+    def span(self, name: str, **args: Any) -> Any:
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, args)
+
+    def record(self, name: str, start: float, end: float, **args: Any) -> None:
+        """Records a span from wall-clock timestamps, e.g. measured in another process."""
+        if not self.enabled:
+            return
+        duration = max(end - start, 0.0)
+        with self.__lock:
+            self.__events.append((name, start, duration, threading.get_ident(), args))
+            aggregate = self.__spans[name]
+            aggregate[0] += 1
+            aggregate[1] += duration
+
+    def count(self, name: str, value: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self.__lock:
+            self.__counters[name] += value
+
+    def drain(self, label: str) -> dict:
+        """Returns everything recorded so far by this process and clears it."""
+        with self.__lock:
+            events, spans, counters = self.__events, self.__spans, self.__counters
+            self.__reset()
+
+        return {
+            "label": label,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "events": [
+                {"name": name, "cat": name.split(".")[0], "ph": "X", "ts": start * 1e6, "dur": duration * 1e6, "tid": tid, "args": args}
+                for name, start, duration, tid, args in events
+            ],
+            "spans": dict(spans),
+            "counters": dict(counters),
+        }
+
+    def flush(self, directory: Path, label: str) -> None:
+        """Writes the recorded data of this process to `directory`, one file per flush."""
+        if not self.enabled:
+            return
+        dump = self.drain(label)
+        if not dump["events"] and not dump["counters"]:
+            return
+
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{dump['host']}_{dump['pid']}_{time.time_ns()}.json"
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(dump, f, separators=(",", ":"), default=str)
+        os.replace(tmp_path, path)
+
+    def export(self, directory: Path, output_dir: Path, label: str = "grader") -> None:
+        """
+        Merges this process' data with every dump flushed to `directory` and writes
+        `trace.json` and `grader.prom` to `output_dir`. The dumps are removed.
+        """
+        if not self.enabled:
+            return
+        dumps = [self.drain(label)]
+        paths = sorted(directory.glob("*.json")) if directory.exists() else []
+        for path in paths:
+            with open(path, "r") as f:
+                dumps.append(json.load(f))
+
+        write_trace(dumps, output_dir / TRACE_FILE)
+        write_metrics(dumps, output_dir / METRICS_FILE)
+
+        for path in paths:
+            path.unlink()
+        if directory.exists() and not any(directory.iterdir()):
+            directory.rmdir()
+
+
+def _atomic_write(path: Path, content: str) -> None:
+    # Textfile collectors and trace viewers must never read a partial file
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def write_trace(dumps: list[dict], path: Path) -> None:
+    trace_events = []
+    # Processes of different nodes may share a pid, every dump gets its own track
+    for track, dump in enumerate(dumps):
+        trace_events.append({"name": "process_name", "ph": "M", "pid": track, "args": {"name": f"{dump['label']} ({dump['host']}:{dump['pid']})"}})
+        for event in dump["events"]:
+            trace_events.append({**event, "pid": track})
+
+    _atomic_write(path, json.dumps({"traceEvents": trace_events, "displayTimeUnit": "ms"}, separators=(",", ":"), default=str))
+
+
+def _metric_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric_name(value: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", value)
+
+
+def write_metrics(dumps: list[dict], path: Path, timestamp: Optional[float] = None) -> None:
+    spans: dict[str, list[float]] = defaultdict(lambda: [0, 0.0])
+    counters: dict[str, float] = defaultdict(float)
+    for dump in dumps:
+        for name, (count, total) in dump["spans"].items():
+            spans[name][0] += count
+            spans[name][1] += total
+        for name, value in dump["counters"].items():
+            counters[name] += value
+
+    lines = [
+        "# HELP grader_span_seconds Time spent in each instrumented stage, summed over all grading processes.",
+        "# TYPE grader_span_seconds summary",
+    ]
+    for name in sorted(spans):
+        count, total = spans[name]
+        lines.append(f'grader_span_seconds_sum{{span="{_metric_label(name)}"}} {total:.6f}')
+        lines.append(f'grader_span_seconds_count{{span="{_metric_label(name)}"}} {int(count)}')
+
+    for name in sorted(counters):
+        metric = f"grader_{_metric_name(name)}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {counters[name]:g}")
+
+    lines.append("# HELP grader_last_run_timestamp_seconds Time the last grading run finished.")
+    lines.append("# TYPE grader_last_run_timestamp_seconds gauge")
+    lines.append(f"grader_last_run_timestamp_seconds {timestamp or time.time():.3f}")
+
+    _atomic_write(path, "\n".join(lines) + "\n")
@@ -0,0 +1,2 @@
+#!/bin/bash
+make -s vector_sum && ./vector_sum
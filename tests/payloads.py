@@ -0,0 +1,26 @@
+"""Canned GitHub Classroom API payloads for the fake server."""
+
+N_SUBMISSIONS = 250
+
+
+def assignment_payload(assignment_id: int, slug: str) -> dict:
+    return {
+        "id": assignment_id, "public_repo": False, "title": slug.title(), "type": "individual",
+        "invite_link": f"https://classroom.github.com/a/{slug}", "invitations_enabled": True,
+        "slug": slug, "students_are_repo_admins": False, "feedback_pull_requests_enabled": False,
+        "max_teams": None, "max_members": None, "editor": None, "accepted": N_SUBMISSIONS,
+        "submissions": N_SUBMISSIONS, "passing": 0, "language": None, "deadline": None,
+    }
+
+
+def submission_payload(idx: int, assignment: dict) -> dict:
+    return {
+        "id": idx, "submitted": True, "passing": False, "commit_count": idx % 3, "grade": None,
+        "students": [{"id": idx, "login": f"student{idx}", "name": None,
+                      "avatar_url": f"https://avatars.githubusercontent.com/u/{idx}",
+                      "html_url": f"https://github.com/student{idx}"}],
+        "assignment": assignment,
+        "repository": {"id": idx, "name": f"vector-sum-student{idx}", "full_name": f"org/vector-sum-student{idx}",
+                       "html_url": f"https://github.com/org/vector-sum-student{idx}", "node_id": f"R_{idx}",
+                       "private": True, "default_branch": "main"},
+    }
@@ -0,0 +1,83 @@
+from gh import AsyncGithubClassroomAPI
+from gh.exceptions import GitHubException
+from gh.fake_server import FakeClassroomServer
+from gh.filters import By
+from gh.structs import AssignmentInfo, SubmissionInfo
+from payloads import N_SUBMISSIONS, assignment_payload, submission_payload
+import asyncio
+import pytest
+
+
+@pytest.fixture(scope="module")
+def server():
+    vector_sum = assignment_payload(1, "vector-sum")
+    classrooms = [
+        {"id": 10, "name": "first", "archived": False, "url": "https://classroom.github.com/classrooms/10"},
+        {"id": 20, "name": "second", "archived": True, "url": "https://classroom.github.com/classrooms/20"},
+    ]
+    assignments = {10: [assignment_payload(2, "warm-up")], 20: [vector_sum]}
+    submissions = {1: [submission_payload(idx, vector_sum) for idx in range(N_SUBMISSIONS)]}
+    commits = {"org/vector-sum-student7": "a" * 40}
+
+    with FakeClassroomServer(classrooms, assignments, submissions, commits) as server:
+        yield server
+
+
+def call(server: FakeClassroomServer, method: str, *args):
+    async def run():
+        async with AsyncGithubClassroomAPI("token", base_url=server.url, max_concurrency=4) as api:
+            return await getattr(api, method)(*args)
+    return asyncio.run(run())
+
+
+def test_submissions_span_every_page(server):
+    submissions = call(server, "get_submissions_for_assignment", 1)
+
+    assert [submission.id for submission in submissions] == list(range(N_SUBMISSIONS))
+    assert all(isinstance(submission, SubmissionInfo) for submission in submissions)
+
+
+def test_submission_decoding(server):
+    submission = call(server, "get_submissions_for_assignment", 1)[7]
+
+    assert submission.commit_count == 1
+    assert submission.grade is None
+    assert submission.pretty_users == "student7"
+    assert submission.repository.full_name == "org/vector-sum-student7"
+    assert submission.repository.default_branch == "main"
+    assert submission.assignment.slug == "vector-sum"
+
+
+def test_embedded_assignment_is_shared(server):
+    submissions = call(server, "get_submissions_for_assignment", 1)
+
+    assert all(submission.assignment is submissions[0].assignment for submission in submissions)
+
+
+@pytest.mark.parametrize("by, value", [
+    (By.ID, 1),
+    (By.SLUG, "vector-sum"),
+    (By.INVITE_LINK, "https://classroom.github.com/a/vector-sum"),
+    (By.TITLE, "Vector-Sum"),
+])
+def test_get_assignment_by(server, by, value):
+    assignment = call(server, "get_assignment_by", by, value)
+
+    assert isinstance(assignment, AssignmentInfo)
+    assert assignment.id == 1
+    assert assignment.deadline is None
+
+
+def test_get_assignment_by_unknown_value(server):
+    with pytest.raises(GitHubException):
+        call(server, "get_assignment_by", By.SLUG, "missing")
+
+
+def test_list_classrooms(server):
+    classrooms = call(server, "list_classrooms")
+
+    assert [(classroom.id, classroom.archived) for classroom in classrooms] == [(10, False), (20, True)]
+
+
+def test_latest_commit_hash(server):
+    assert call(server, "get_latest_commit_hash", "org/vector-sum-student7", "main") == "a" * 40
@@ -0,0 +1,36 @@
+from grader.capture import limited_command, run_captured
+import time
+
+
+def test_background_child_holding_the_output_is_killed_at_the_timeout(tmp_path):
+    script = tmp_path / "script.sh"
+    script.write_text("#!/bin/sh\nsleep 30 &\necho '{\"passed\": 1}'\n")
+    script.chmod(0o755)
+
+    start = time.monotonic()
+    result = run_captured([script], cwd=tmp_path, timeout=1)
+
+    assert time.monotonic() - start < 10
+    assert result.timed_out
+    assert result.returncode == 0
+    assert result.stdout.strip() == '{"passed": 1}'
+
+
+def test_script_within_the_timeout_is_not_flagged(tmp_path):
+    result = run_captured(["sh", "-c", "echo done"], cwd=tmp_path, timeout=10)
+
+    assert not result.timed_out
+    assert result.stdout == "done\n"
+
+
+def test_missing_executable_fails_only_this_run(tmp_path):
+    result = run_captured([tmp_path / "missing.sh"], cwd=tmp_path, timeout=10)
+
+    assert result.returncode != 0
+    assert "missing.sh" in result.stderr
+
+
+def test_limits_without_their_tool_are_dropped(monkeypatch):
+    monkeypatch.setattr("shutil.which", lambda name: None)
+
+    assert limited_command(["./grade.sh"], mem_limit_mb=512, cpus=[3]) == ["./grade.sh"]
@@ -0,0 +1,46 @@
+from grader.grader import Grader
+from grader.results import ResultsLog
+from grader.state import StateStore, CHECKOUT_FAILED
+from types import SimpleNamespace
+import json
+import logging
+
+REPO = "https://github.com/org/vector-sum-alice"
+
+
+class FakeRunner:
+    def __init__(self, results: list[list[dict]]) -> None:
+        self.results = results
+
+    def collect_results(self, jobid: int) -> list[dict]:
+        return self.results[jobid]
+
+
+def result(status: str, commit_hash: str, runtimes: list[float]) -> dict:
+    return {"name": "alice", "repo": REPO, "repo_dir": "/tmp/alice", "commit_hash": commit_hash, "status": status,
+            "error": "", "stdout": "", "runtimes": runtimes, "stats": None, "data": {"times": runtimes} if runtimes else None}
+
+
+def test_failed_checkout_keeps_the_last_grade(tmp_path):
+    runner = FakeRunner([
+        [result("graded", "1" * 40, [1.5])],
+        [result(CHECKOUT_FAILED, "2" * 40, [])],
+    ])
+    grades_file = tmp_path / "leaderboard.json"
+    grader = SimpleNamespace(
+        runner=runner,
+        log=logging.getLogger("grader"),
+        results=ResultsLog(tmp_path / "results.jsonl"),
+        state=StateStore(tmp_path / "grading_state.db"),
+        config=SimpleNamespace(grader=SimpleNamespace(grades_file=str(grades_file))),
+    )
+    assignment = SimpleNamespace(name="vector-sum")
+    task = SimpleNamespace(name="cpu", performance_hash=lambda: "hash")
+
+    Grader._collect_task(grader, assignment, task, 0)
+    graded = json.loads(grades_file.read_text())
+    Grader._collect_task(grader, assignment, task, 1)
+
+    assert json.loads(grades_file.read_text()) == graded
+    # Not completed, the commit is checked out again on the next run
+    assert grader.state.completed("vector-sum", "cpu", "hash") == {(REPO, "1" * 40)}
@@ -0,0 +1,74 @@
+from gh import GithubClassroomAPI
+from gh.exceptions import GitHubException
+from gh.filters import By
+from gh.fake_server import FakeClassroomServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from payloads import N_SUBMISSIONS, assignment_payload, submission_payload
+import json
+import pytest
+import threading
+
+
+def test_cached_listing_picks_up_new_pages(tmp_path):
+    vector_sum = assignment_payload(1, "vector-sum")
+    submissions = {1: [submission_payload(idx, vector_sum) for idx in range(N_SUBMISSIONS)]}
+
+    with FakeClassroomServer([], {}, submissions) as server:
+        api = GithubClassroomAPI("token", cache_dir=str(tmp_path), base_url=server.url)
+        assert len(api.get_submissions_for_assignment(1)) == N_SUBMISSIONS
+
+        # The first page is unchanged and revalidates with a 304, along with its stale Link header
+        submissions[1].extend(submission_payload(idx, vector_sum) for idx in range(N_SUBMISSIONS, N_SUBMISSIONS + 60))
+        listed = api.get_submissions_for_assignment(1)
+
+    assert [submission.id for submission in listed] == list(range(N_SUBMISSIONS + 60))
+    assert api.cache_stats["hits"] >= 1
+
+
+def test_assignment_created_later_rebuilds_the_index():
+    classrooms = [{"id": 10, "name": "first", "archived": False, "url": "https://classroom.github.com/classrooms/10"}]
+    assignments = {10: [assignment_payload(2, "warm-up")]}
+
+    with FakeClassroomServer(classrooms, assignments, {}) as server:
+        api = GithubClassroomAPI("token", base_url=server.url)
+        assert api.get_assignment_by(By.SLUG, "warm-up").id == 2
+
+        assignments[10].append(assignment_payload(1, "vector-sum"))
+        # The index was just built, a miss right away doesn't list the classrooms again
+        with pytest.raises(GitHubException):
+            api.get_assignment_by(By.SLUG, "vector-sum")
+
+        # Later on, e.g. in the daemon's next run, the miss rebuilds it
+        api.INDEX_REBUILD_INTERVAL = 0
+        assert api.get_assignment_by(By.SLUG, "vector-sum").id == 1
+
+
+def test_rate_limited_answer_reaches_the_rate_limiter():
+    answers = [(429, {"Retry-After": "1"}), (200, {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "4999"})]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            status, headers = answers.pop(0)
+            payload = json.dumps([]).encode("utf-8")
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        api = GithubClassroomAPI("token", http_cache=False, base_url=f"http://127.0.0.1:{server.server_address[1]}")
+        assert api.list_classrooms() == []
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert answers == []
+    assert api.rate_limiter.blocked_until > 0
+    assert api.quota["remaining"] == 4999
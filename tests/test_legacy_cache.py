@@ -0,0 +1,55 @@
+from config import AssignmentConfig, AssignmentTaskConfig
+from grader.grader import Grader
+from grader.state import StateStore
+from pathlib import Path
+from shutil import copyfile
+from types import SimpleNamespace
+import logging
+import pytest
+
+DATA = Path(__file__).parent / "data"
+
+# Written by the SLURM-only grader that predates the state store, for the task below
+LEGACY_CACHE = DATA / "test-cpu_cache.json"
+LEGACY_COMMITS = {
+    ("https://github.com/org/vector-sum-student1", "1" * 40),
+    ("https://github.com/org/vector-sum-student2", "2" * 40),
+}
+
+
+def legacy_task(**slurm_config) -> AssignmentTaskConfig:
+    config = {"slurm_partition": "short", "timeout_min": 60, "mem_gb": 4, "nodes": 1, "tasks_per_node": 1, "cpus_per_task": 2}
+    return AssignmentTaskConfig.from_dict({
+        "name": "test-cpu",
+        "test_script_path": "tests/data/test_vectorsum_cpu.sh",
+        "slurm_backend": {"config": config | slurm_config},
+    })
+
+
+@pytest.fixture
+def grader(tmp_path, monkeypatch):
+    # The legacy hash covers the test script path as written in the config
+    monkeypatch.chdir(Path(__file__).parent.parent)
+    (tmp_path / ".cache").mkdir()
+    copyfile(LEGACY_CACHE, tmp_path / ".cache" / LEGACY_CACHE.name)
+    return SimpleNamespace(wd=tmp_path, state=StateStore(tmp_path / ".cache" / "grading_state.db"), log=logging.getLogger("grader"))
+
+
+def import_legacy_cache(grader, task: AssignmentTaskConfig) -> set[tuple[str, str]]:
+    assignment = AssignmentConfig(name="vector-sum", slug="vector-sum", tasks=[task])
+    perf_hash = task.performance_hash()
+    Grader._import_legacy_cache(grader, assignment, task, perf_hash)
+    return grader.state.completed(assignment.name, task.name, perf_hash)
+
+
+def test_legacy_cache_is_imported(grader):
+    assert import_legacy_cache(grader, legacy_task()) == LEGACY_COMMITS
+
+
+def test_legacy_cache_keeps_explicit_job_name(grader):
+    # The old runner only named jobs that had no name, a different name is a different config
+    assert import_legacy_cache(grader, legacy_task(slurm_job_name="custom")) == set()
+
+
+def test_legacy_cache_of_changed_config_is_ignored(grader):
+    assert import_legacy_cache(grader, legacy_task(cpus_per_task=4)) == set()
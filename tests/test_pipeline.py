@@ -0,0 +1,19 @@
+from grader.pipeline import PrefetchPipeline
+import pytest
+
+
+def checkout(item: int) -> str:
+    if item == 1:
+        raise RuntimeError("clone failed")
+    return f"repo{item}"
+
+
+@pytest.mark.parametrize("depth", [0, 1, 2])
+def test_failed_prepare_does_not_stop_the_pipeline(depth):
+    pipeline = PrefetchPipeline(range(4), checkout, depth=depth, disk_budget_bytes=1, size=lambda value: 1)
+    seen = []
+    for prefetched in pipeline:
+        seen.append((prefetched.item, prefetched.value, str(prefetched.error) if prefetched.error else None))
+        pipeline.release(prefetched)
+
+    assert seen == [(0, "repo0", None), (1, None, "clone failed"), (2, "repo2", None), (3, "repo3", None)]
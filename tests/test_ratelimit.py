@@ -0,0 +1,76 @@
+from gh.ratelimit import RateLimiter
+import time
+
+
+def quota_headers(remaining: int, reset_at: float, limit: int = 5000) -> dict[str, str]:
+    return {"X-RateLimit-Limit": str(limit), "X-RateLimit-Remaining": str(remaining), "X-RateLimit-Reset": str(int(reset_at))}
+
+
+def test_not_modified_answers_leave_the_quota_untouched():
+    limiter = RateLimiter()
+    reset_at = time.time() + 3600
+    limiter.acquire()
+    limiter.update(quota_headers(4000, reset_at), 200)
+
+    for _ in range(10):
+        limiter.acquire()
+        limiter.update(quota_headers(4000, reset_at), 304)
+
+    assert limiter.quota["remaining"] == 4000
+    assert limiter.quota["requests"] == 11
+
+
+def test_in_flight_requests_are_deducted():
+    limiter = RateLimiter()
+    reset_at = time.time() + 3600
+    limiter.acquire()
+    limiter.update(quota_headers(4000, reset_at), 200)
+
+    limiter.acquire()
+    limiter.acquire()
+    assert limiter.remaining == 3998
+
+    limiter.update(quota_headers(3999, reset_at), 200)
+    assert limiter.remaining == 3998
+
+    # A request that failed without a response gives its token back
+    limiter.release()
+    assert limiter.remaining == 3999
+
+
+def test_out_of_order_answers_keep_the_lowest_count():
+    limiter = RateLimiter()
+    reset_at = time.time() + 3600
+    for _ in range(2):
+        limiter.acquire()
+    limiter.update(quota_headers(3990, reset_at), 200)
+    limiter.update(quota_headers(3995, reset_at), 200)
+
+    assert limiter.remaining == 3990
+
+    # A new window starts over from the server's count
+    limiter.acquire()
+    limiter.update(quota_headers(4999, reset_at + 3600), 200)
+    assert limiter.remaining == 4999
+
+
+def test_rate_limited_answers_are_retried_after_the_requested_time():
+    limiter = RateLimiter()
+    limiter.acquire()
+
+    assert limiter.update({"Retry-After": "30"}, 429)
+    assert limiter.blocked_until >= time.time() + 29
+
+    # Other failures are not the rate limiter's to retry
+    limiter = RateLimiter()
+    limiter.acquire()
+    assert not limiter.update({}, 500)
+
+
+def test_exhausted_quota_blocks_until_the_reset():
+    limiter = RateLimiter()
+    reset_at = time.time() + 60
+    limiter.acquire()
+
+    assert limiter.update(quota_headers(0, reset_at), 403)
+    assert limiter.blocked_until == int(reset_at)
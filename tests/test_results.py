@@ -0,0 +1,47 @@
+from grader.results import ResultsLog
+import json
+
+
+def result(name: str, status: str, runtime: float) -> dict:
+    return {"name": name, "repo": f"https://github.com/org/{name}", "repo_dir": f"/tmp/{name}", "commit_hash": "a" * 40,
+            "status": status, "error": "", "stdout": "", "runtimes": [runtime], "stats": None, "data": {"times": [runtime]}}
+
+
+def read_log(log: ResultsLog) -> list[dict]:
+    return [json.loads(line) for line in log.path.read_text().splitlines()]
+
+
+def grades(leaderboard: dict) -> dict:
+    return {(assignment, student["name"]): (student["status"], student["data"]) for assignment, students in leaderboard.items() for student in students}
+
+
+def test_compaction_keeps_the_latest_entry_of_every_student_and_task(tmp_path):
+    log = ResultsLog(tmp_path / "results.jsonl")
+    log.append("vector-sum", "cpu", [result("alice", "error", 3.0), result("bob", "graded", 2.0)])
+    log.append("vector-sum", "gpu", [result("alice", "graded", 1.0)])
+    for runtime in (2.5, 1.8, 1.5, 1.2):
+        log.append("vector-sum", "cpu", [result("alice", "graded", runtime)])
+    latest = read_log(log)[-1]
+
+    leaderboard = log.materialize(tmp_path / "leaderboard.json")
+    entries = read_log(log)
+
+    # 7 lines for 3 students and tasks, the log was rewritten
+    assert sorted((entry["task"], entry["name"], entry["runtimes"]) for entry in entries) == [
+        ("cpu", "alice", [1.2]), ("cpu", "bob", [2.0]), ("gpu", "alice", [1.0]),
+    ]
+    # Compacted entries are kept verbatim, timestamps included
+    assert latest in entries
+    assert all("ts" in entry and "repo_dir" not in entry for entry in entries)
+    # Students may be listed in another order, their grades are unchanged
+    assert grades(log.materialize(tmp_path / "leaderboard.json")) == grades(leaderboard)
+
+
+def test_short_log_is_not_compacted(tmp_path):
+    log = ResultsLog(tmp_path / "results.jsonl")
+    log.append("vector-sum", "cpu", [result("alice", "error", 3.0)])
+    log.append("vector-sum", "cpu", [result("alice", "graded", 1.0)])
+
+    log.materialize(tmp_path / "leaderboard.json")
+
+    assert [entry["status"] for entry in read_log(log)] == ["error", "graded"]
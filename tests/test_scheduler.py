@@ -0,0 +1,98 @@
+from config import AssignmentConfig, AssignmentTaskConfig
+from grader.exceptions import GraderException
+from grader.scheduler import TaskScheduler
+from pathlib import Path
+import pytest
+
+TEST_SCRIPT = str(Path(__file__).parent / "data" / "test_vectorsum_cpu.sh")
+
+
+class FakeRunner:
+    """Jobs finish on the first poll after they were submitted."""
+    def __init__(self) -> None:
+        self.submitted: list[str] = []
+
+    def submit(self, key: str) -> int:
+        self.submitted.append(key)
+        return len(self.submitted) - 1
+
+    def finished(self, jobids: list[int]) -> set[int]:
+        return set(jobids)
+
+
+def failing_submit() -> int:
+    raise RuntimeError("could not fetch the submissions")
+
+
+def test_dependents_run_after_their_dependencies():
+    runner = FakeRunner()
+    collected = []
+    scheduler = TaskScheduler(runner, poll_interval=0)
+    scheduler.add("gpu", ["cpu"], lambda: True, lambda: runner.submit("gpu"), collected.append)
+    scheduler.add("cpu", [], lambda: True, lambda: runner.submit("cpu"), collected.append)
+
+    scheduler.run()
+
+    assert runner.submitted == ["cpu", "gpu"]
+    assert collected == [0, 1]
+
+
+def test_failed_submit_releases_its_dependents():
+    runner = FakeRunner()
+    scheduler = TaskScheduler(runner, poll_interval=0)
+    scheduler.add("cpu", [], lambda: True, failing_submit)
+    scheduler.add("gpu", ["cpu"], lambda: True, lambda: runner.submit("gpu"))
+    scheduler.add("report", ["gpu"], lambda: True, lambda: runner.submit("report"))
+
+    scheduler.run()
+
+    assert runner.submitted == ["gpu", "report"]
+
+
+def test_cycle_raises():
+    runner = FakeRunner()
+    scheduler = TaskScheduler(runner, poll_interval=0)
+    scheduler.add("cpu", ["gpu"], lambda: True, lambda: runner.submit("cpu"))
+    scheduler.add("gpu", ["cpu"], lambda: True, lambda: runner.submit("gpu"))
+    scheduler.add("warm-up", [], lambda: True, lambda: runner.submit("warm-up"))
+
+    with pytest.raises(GraderException, match="can never run"):
+        scheduler.run()
+    assert runner.submitted == ["warm-up"]
+
+
+def test_unknown_dependency_raises():
+    scheduler = TaskScheduler(FakeRunner(), poll_interval=0)
+    scheduler.add("gpu", ["cpu"], lambda: True, lambda: None)
+
+    with pytest.raises(GraderException, match="unknown task"):
+        scheduler.run()
+
+
+def test_config_rejects_cycles():
+    tasks = [
+        AssignmentTaskConfig.from_dict({"name": "cpu", "test_script_path": TEST_SCRIPT, "slurm_backend": {"config": {}}, "depends_on": ["gpu"], "blocking": True}),
+        AssignmentTaskConfig.from_dict({"name": "gpu", "test_script_path": TEST_SCRIPT, "slurm_backend": {"config": {}}}),
+    ]
+    assignment = AssignmentConfig(name="vector-sum", slug="vector-sum", tasks=tasks)
+
+    # cpu waits for gpu through depends_on, gpu waits for the earlier blocking cpu
+    with pytest.raises(AssertionError, match="Circular depends_on"):
+        assignment.assert_valid()
+
+
+def test_inputs_becoming_ready_mid_iteration_do_not_look_like_a_deadlock():
+    runner = FakeRunner()
+    calls = []
+
+    def ready() -> bool:
+        # The fetch completes between the runnable check and the deadlock check
+        calls.append(None)
+        return len(calls) > 1
+
+    scheduler = TaskScheduler(runner, poll_interval=0)
+    scheduler.add("cpu", [], ready, lambda: runner.submit("cpu"))
+
+    scheduler.run()
+
+    assert runner.submitted == ["cpu"]